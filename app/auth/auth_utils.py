@@ -1,14 +1,32 @@
-from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordBearer
-from app.services.database import get_user_by_username
+from app.services.database import AUTH_PROJECTION, get_user_by_username, update_user_password
+from app.services.user_cache import get_cached_public_user
 from .jwt_handler import jwt_handler
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import bcrypt
+import hmac
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: argon2id with the OWASP 46 MiB / t=1 profile
+password_hasher = PasswordHasher(
+    memory_cost=46 * 1024,
+    time_cost=1,
+    parallelism=1,
+)
+
+# Hashes from before argon2 are bcrypt; they are still accepted and upgraded on login
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+BCRYPT_HASH_LENGTH = 60
+
+# Dedicated pool for password hashing; argon2 and bcrypt release the GIL so hashes run in parallel
+hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="password-hash")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -17,26 +35,64 @@ class AuthUtils:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        if hashed_password.startswith(BCRYPT_PREFIXES):
+            # Compare the recomputed digest in constant time so mismatches don't leak timing
+            stored = hashed_password.encode()
+            if len(stored) != BCRYPT_HASH_LENGTH:
+                return False
+            computed = bcrypt.hashpw(plain_password.encode(), stored)
+            return hmac.compare_digest(computed, stored)
+        try:
+            return password_hasher.verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
 
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generate password hash"""
-        return pwd_context.hash(password)
+        return password_hasher.hash(password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """Check whether a stored hash uses a deprecated scheme or outdated parameters"""
+        if hashed_password.startswith(BCRYPT_PREFIXES):
+            return True
+        return password_hasher.check_needs_rehash(hashed_password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the hashing pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hash_executor, AuthUtils.verify_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Generate password hash on the hashing pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hash_executor, AuthUtils.get_password_hash, password)
 
     @staticmethod
     async def authenticate_user(username: str, password: str) -> dict:
         """Authenticate user credentials"""
         try:
-            user = await get_user_by_username(username)
+            user = await get_user_by_username(username, projection=AUTH_PROJECTION)
             if not user:
                 logger.warning(f"Authentication failed: User '{username}' not found")
                 return False
             
-            if not AuthUtils.verify_password(password, user["password"]):
+            if not await AuthUtils.verify_password_async(password, user["password"]):
                 logger.warning(f"Authentication failed: Invalid password for user '{username}'")
                 return False
             
+            # Upgrade legacy hashes now that we have the plain password
+            if AuthUtils.needs_rehash(user["password"]):
+                try:
+                    new_hash = await AuthUtils.get_password_hash_async(password)
+                    await update_user_password(username, new_hash)
+                    logger.info(f"Password hash upgraded for user '{username}'")
+                except Exception as e:
+                    logger.error(f"Password rehash failed for user '{username}': {e}")
+            
             logger.info(f"User '{username}' authenticated successfully")
             return user
             
@@ -44,18 +100,8 @@ class AuthUtils:
             logger.error(f"Authentication error for user '{username}': {e}")
             return False
 
-    @staticmethod
-    def validate_password_strength(password: str) -> bool:
-        """Validate password meets minimum requirements"""
-        if len(password) < 8:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Password must be at least 8 characters long"
-            )
-        return True
-
 # Dependency to get current user from JWT token
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> dict:
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,22 +110,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     )
     
     try:
-        # Verify and decode the token
-        payload = jwt_handler.verify_token(token)
+        # Reuse the payload verified by JWTMiddleware, verify here only if it didn't run
+        payload = getattr(request.state, "token_payload", None) or jwt_handler.verify_token(token)
         username: str = payload.get("sub")
         
         if username is None:
             raise credentials_exception
         
-        # Get user from app.services.database
-        user = await get_user_by_username(username)
+        # Get user from the cache; it is loaded without the password field
+        user = await get_cached_public_user(username)
         if user is None:
             logger.warning(f"User '{username}' not found in database")
             raise credentials_exception
         
-        # Remove password from user data before returning
-        user_safe = {k: v for k, v in user.items() if k != "password"}
-        return user_safe
+        return user
         
     except HTTPException:
         raise
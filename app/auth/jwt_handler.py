@@ -1,16 +1,36 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+import jwt
+from jwt import ExpiredSignatureError, InvalidTokenError
 from fastapi import HTTPException, status
+from cachetools import TTLCache
 from app.config import settings
+import hashlib
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Cache of already verified tokens: token digest -> (payload, exp timestamp)
+_verified_tokens = TTLCache(
+    maxsize=settings.jwt_cache_max_entries,
+    ttl=settings.jwt_cache_ttl_seconds
+)
+_verified_tokens_lock = threading.Lock()
+
+def _token_cache_key(token: str) -> bytes:
+    """Short fixed-size cache key for a raw token"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 class JWTHandler:
     def __init__(self):
         self.secret_key = settings.jwt_secret_key
         self.algorithm = settings.jwt_algorithm
+        if self.algorithm.lower() == "none":
+            raise ValueError("JWT_ALGORITHM 'none' would accept unsigned tokens")
+        # Tokens are only ever accepted with the configured algorithm
+        self.algorithms = [self.algorithm]
         self.access_token_expire_minutes = settings.access_token_expire_minutes
 
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -18,12 +38,10 @@ class JWTHandler:
         try:
             to_encode = data.copy()
             
-            if expires_delta:
-                expire = datetime.utcnow() + expires_delta
-            else:
-                expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
+            now = datetime.now(timezone.utc)
+            expire = now + (expires_delta or timedelta(minutes=self.access_token_expire_minutes))
             
-            to_encode.update({"exp": expire, "iat": datetime.utcnow()})
+            to_encode.update({"exp": expire, "iat": now})
             encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
             
             logger.info(f"JWT token created for user: {data.get('sub')}")
@@ -38,32 +56,39 @@ class JWTHandler:
 
     def verify_token(self, token: str) -> Dict[str, Any]:
         """Verify and decode JWT token"""
+        cache_key = _token_cache_key(token)
+        with _verified_tokens_lock:
+            cached = _verified_tokens.get(cache_key)
+        
+        # Cached entries still have to honour the token's own expiry
+        if cached is not None:
+            payload, exp_ts = cached
+            if time.time() < exp_ts:
+                return payload
+        
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            username: str = payload.get("sub")
-            
-            if username is None:
-                logger.warning("Token missing 'sub' claim")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid authentication credentials",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
+            # PyJWT checks exp and rejects tokens missing 'sub'/'exp' while decoding
+            payload = jwt.decode(
+                token,
+                self.secret_key,
+                algorithms=self.algorithms,
+                options={"require": ["exp", "sub"]}
+            )
             
-            # Check if token is expired
-            exp = payload.get("exp")
-            if exp is None or datetime.utcnow() > datetime.fromtimestamp(exp):
-                logger.warning(f"Expired token for user: {username}")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token expired",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
+            with _verified_tokens_lock:
+                _verified_tokens[cache_key] = (payload, payload["exp"])
             
-            logger.info(f"Token verified successfully for user: {username}")
+            logger.info(f"Token verified successfully for user: {payload['sub']}")
             return payload
             
-        except JWTError as e:
+        except ExpiredSignatureError:
+            logger.warning("Expired token presented")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token expired",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        except InvalidTokenError as e:
             logger.error(f"JWT verification error: {e}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,49 +1,100 @@
-from pydantic_settings import BaseSettings
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from functools import lru_cache
+from typing import Annotated, List, Optional
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 class Settings(BaseSettings):
+    # Every field is read from the environment variable of the same name (case-insensitive) or .env
+
     # JWT Configuration
-    jwt_secret_key: str = os.getenv("JWT_SECRET_KEY")
-    jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
-    access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
-    
+    jwt_secret_key: Optional[str] = None
+    jwt_algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    jwt_cache_ttl_seconds: int = 5
+    jwt_cache_max_entries: int = 10000
+
     # MongoDB Configuration
-    mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    database_name: str = os.getenv("DATABASE_NAME", "fastapi_auth")
-    users_collection: str = os.getenv("USERS_COLLECTION", "users")
-    users_chat_collection: str = os.getenv("USERS_CHAT_COLLECTION", "chat_history")
-    
+    mongodb_url: str = "mongodb://localhost:27017"
+    database_name: str = "fastapi_auth"
+    users_collection: str = "users"
+    users_chat_collection: str = "chat_history"
+    mongodb_max_pool_size: int = 50
+    mongodb_min_pool_size: int = 5
+    mongodb_wait_queue_timeout_ms: int = 2000
+    history_cache_ttl_seconds: int = 30
+    chat_history_max_messages: int = 1000
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_entries: int = 5000
+
+    # Redis Configuration (Celery broker/backend and staged uploads)
+    redis_url: str = "redis://localhost:6379/0"
+    redis_socket_timeout: float = 5.0
+    redis_socket_connect_timeout: float = 2.0
+    upload_staging_ttl_seconds: int = 3600
+    celery_concurrency: Optional[int] = None  # defaults to the CPU count
+    celery_task_soft_time_limit: int = 540
+    celery_task_time_limit: int = 600
+    celery_max_tasks_per_child: int = 50
+
     # App Configuration
-    host: str = os.getenv("HOST", "0.0.0.0")
-    port: int = int(os.getenv("PORT", 8000))
-    debug: bool = os.getenv("DEBUG", "True").lower() == "true"
-
-        # Qdrant Configuration
-    qdrant_url: str = os.getenv("QDRANT_URL", "http://localhost:6333")
-    qdrant_api_key: str = os.getenv("QDRANT_API_KEY", "")
-    
+    host: str = "0.0.0.0"
+    port: int = 8000
+    debug: bool = True
+
+    # Qdrant Configuration
+    qdrant_url: str = "http://localhost:6333"
+    qdrant_api_key: str = ""
+    qdrant_prefer_grpc: bool = True
+    qdrant_grpc_port: int = 6334
+    qdrant_timeout: int = 10
+
     # LLM Configuration
-    google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
-    
+    google_api_key: str = ""
+    openai_api_key: str = ""
+
     # RAG Settings
-    collection_name: str = os.getenv("COLLECTION_NAME", "rag_documents")
-    chunk_size: int = int(os.getenv("CHUNK_SIZE", 1000))
-    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", 100))
-    
+    collection_name: str = "rag_documents"
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    ingest_batch_size: int = 96
+    upload_concurrency: int = 8
+    history_token_budget: int = 2000
+    rag_cache_ttl_seconds: int = 3600
+    rag_cache_max_entries: int = 1024
+
     # File Upload Settings
-    max_file_size: int = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB
-    allowed_file_types: list = os.getenv("ALLOWED_FILE_TYPES", "pdf,txt,md").split(",")
-    
+    max_file_size: int = 10485760  # 10MB
+    allowed_file_types: Annotated[List[str], NoDecode] = ["pdf", "txt", "md"]
+
     # Vector Search Settings
     vector_size: int = 1536  # OpenAI ada-002 embedding size
     top_k_results: int = 5
     similarity_threshold: float = 0.7
+    hybrid_search_enabled: bool = True
+    rrf_k: int = 60
+    embedding_cache_max_entries: int = 4096
+    embedding_batch_wait_ms: int = 5
+    embedding_batch_max_size: int = 64
+    search_batch_wait_ms: int = 5
+    search_batch_max_size: int = 32
+    semantic_cache_threshold: float = 0.97
+    semantic_cache_ttl_seconds: int = 600
+    semantic_cache_max_entries: int = 256  # per user scope
+    semantic_cache_max_scopes: int = 1024
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    @field_validator("allowed_file_types", mode="before")
+    @classmethod
+    def split_allowed_file_types(cls, v):
+        # ALLOWED_FILE_TYPES is a comma separated list, e.g. "pdf,txt,md"
+        if isinstance(v, str):
+            return [ext.strip() for ext in v.split(",") if ext.strip()]
+        return v
 
-    class Config:
-        env_file = ".env"
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the settings once per process"""
+    return Settings()
 
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
@@ -1,5 +1,7 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 import uvicorn
@@ -44,7 +46,8 @@ app = FastAPI(
     title="FastAPI JWT Auth System",
     description="A comprehensive authentication system with JWT tokens and MongoDB",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -56,6 +59,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (chat answers, history); sits inside JWT so 401s stay uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Add custom middleware
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(
@@ -111,9 +117,9 @@ async def admin_route():
 async def global_exception_handler(request, exc):
     """Global exception handler"""
     logger.error(f"Global exception: {exc}")
-    return HTTPException(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        detail="Internal server error"
+        content={"detail": "Internal server error"}
     )
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 from fastapi import Request, Response, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
 import logging
+import orjson
 import time
 from typing import Callable
 from app.auth.jwt_handler import jwt_handler
@@ -28,30 +29,34 @@ class JWTMiddleware(BaseHTTPMiddleware):
             "/openapi.json",
             "/health"
         ]
+        # Prefix tuples so each check is a single str.startswith call
+        self._excluded = tuple(self.excluded_paths)
+        self._protected = tuple(self.protected_paths)
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         path = request.url.path
         
         # Skip JWT validation for excluded paths
-        if any(path.startswith(excluded) for excluded in self.excluded_paths):
+        if path.startswith(self._excluded):
             return await call_next(request)
         
         # Skip JWT validation for non-protected paths
-        if not any(path.startswith(protected) for protected in self.protected_paths):
+        if not path.startswith(self._protected):
             return await call_next(request)
         
         # Extract JWT token from Authorization header
         authorization = request.headers.get("Authorization")
         
-        if not authorization or not authorization.startswith("Bearer "):
+        # Scheme is case-insensitive; slice the token out rather than splitting the header
+        if not authorization or len(authorization) < 8 or authorization[:7].lower() != "bearer ":
             return Response(
-                content='{"detail":"Missing or invalid authorization header"}',
+                content=orjson.dumps({"detail": "Missing or invalid authorization header"}),
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 media_type="application/json",
                 headers={"WWW-Authenticate": "Bearer"}
             )
         
-        token = authorization.split(" ")[1]
+        token = authorization[7:].strip()
         
         try:
             # Verify the token
@@ -63,7 +68,7 @@ class JWTMiddleware(BaseHTTPMiddleware):
             
         except HTTPException as e:
             return Response(
-                content=f'{{"detail":"{e.detail}"}}',
+                content=orjson.dumps({"detail": e.detail}),
                 status_code=e.status_code,
                 media_type="application/json",
                 headers=e.headers or {}
@@ -71,7 +76,7 @@ class JWTMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             logger.error(f"JWT middleware error: {e}")
             return Response(
-                content='{"detail":"Authentication failed"}',
+                content=orjson.dumps({"detail": "Authentication failed"}),
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 media_type="application/json",
                 headers={"WWW-Authenticate": "Bearer"}
@@ -82,23 +87,27 @@ class JWTMiddleware(BaseHTTPMiddleware):
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Middleware for request/response logging"""
     
+    def __init__(self, app, skip_paths: list = None):
+        super().__init__(app)
+        # Health checks and API docs are polled often and not worth timing
+        self._skip = tuple(skip_paths or ["/health", "/openapi.json", "/docs", "/redoc"])
+    
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+        if request.url.path.startswith(self._skip):
+            return await call_next(request)
         
-        # Log request
-        logger.info(f"Request: {request.method} {request.url.path}")
+        start_time = time.perf_counter()
         
         # Process request
         response = await call_next(request)
         
         # Calculate processing time
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         
-        # Log response
+        # One line per request; %-args are only formatted if INFO is enabled
         logger.info(
-            f"Response: {response.status_code} | "
-            f"Time: {process_time:.4f}s | "
-            f"Path: {request.url.path}"
+            "%s %s -> %d | Time: %.4fs",
+            request.method, request.url.path, response.status_code, process_time
         )
         
         # Add processing time to response headers
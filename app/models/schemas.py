@@ -1,4 +1,4 @@
-from pydantic import BaseModel, validator, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -19,8 +19,7 @@ class UserResponse(UserBase):
     is_active: bool = True
     is_admin: bool = False
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserUpdate(BaseModel):
     password: Optional[str] = Field(None, min_length=8, description="Password must be at least 8 characters")
@@ -37,12 +36,6 @@ class PasswordChange(BaseModel):
     current_password: str
     new_password: str = Field(..., min_length=8, description="New password must be at least 8 characters")
 
-    @validator('new_password')
-    def validate_new_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        return v
-
 class UserList(BaseModel):
     users: List[UserResponse]
     total: int
@@ -1,17 +1,27 @@
 import os
 import asyncio
+import codecs
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import BinaryIO, Dict, List, Optional
 from datetime import datetime
 from fastapi import HTTPException, UploadFile
 import PyPDF2
-import io
+import pypdfium2 as pdfium
+from charset_normalizer import from_bytes
 from app.config import settings
 settings
 from .vector_db import text_chunker
 
 logger = logging.getLogger(__name__)
 
+# Text uploads are decoded in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# PDFium is not thread-safe and pypdfium2 doesn't serialize calls into it, so every
+# open/read/close across the worker threads goes through this lock
+_PDFIUM_LOCK = threading.Lock()
+
 class FileProcessor:
     """
     Handles file upload, processing, and text extraction
@@ -21,15 +31,22 @@ class FileProcessor:
         self.max_file_size = settings.max_file_size
         self.allowed_extensions = settings.allowed_file_types
     
+    def check_upload_size(self, file: UploadFile):
+        """Reject empty or oversized uploads without reading them"""
+        size = self._upload_size(file)
+        if size > self.max_file_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {self.max_file_size / (1024*1024):.1f}MB"
+            )
+        if size == 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+    
     def validate_file(self, file: UploadFile) -> bool:
         """Validate uploaded file"""
         try:
             # Check file size
-            if file.size and file.size > self.max_file_size:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File too large. Maximum size: {self.max_file_size / (1024*1024):.1f}MB"
-                )
+            self.check_upload_size(file)
             
             # Check file extension
             if file.filename:
@@ -48,21 +65,35 @@ class FileProcessor:
             logger.error(f"❌ File validation error: {e}")
             raise HTTPException(status_code=400, detail="File validation failed")
     
+    def _upload_size(self, file: UploadFile) -> int:
+        """Size of the upload; Starlette records it while parsing, rebuilt UploadFiles don't"""
+        if file.size is not None:
+            return file.size
+        
+        fp = file.file
+        position = fp.tell()
+        fp.seek(0, os.SEEK_END)
+        size = fp.tell()
+        fp.seek(position)
+        return size
+    
     async def extract_text_from_file(self, file: UploadFile) -> Dict:
         """Extract text content from uploaded file"""
         try:
             self.validate_file(file)
             
-            # Read file content
-            content = await file.read()
+            # The upload is already spooled by Starlette; read it in place instead of copying it
+            file_size = self._upload_size(file)
             filename = file.filename
             file_extension = filename.split('.')[-1].lower() if filename else ""
             
             # Extract text based on file type
             if file_extension == 'pdf':
-                text = await self._extract_from_pdf(content)
+                await file.seek(0)
+                text = await self._extract_from_pdf(file.file)
             elif file_extension in ['txt', 'md']:
-                text = await self._extract_from_text(content)
+                await file.seek(0)
+                text = await self._extract_from_text(file)
             else:
                 raise HTTPException(
                     status_code=400, 
@@ -73,7 +104,7 @@ class FileProcessor:
             metadata = {
                 "filename": filename,
                 "file_type": file_extension,
-                "file_size": len(content),
+                "file_size": file_size,
                 "upload_date": datetime.utcnow().isoformat(),
                 "character_count": len(text),
                 "word_count": len(text.split())
@@ -95,19 +126,11 @@ class FileProcessor:
                 detail=f"Failed to extract text from file: {str(e)}"
             )
     
-    async def _extract_from_pdf(self, content: bytes) -> str:
+    async def _extract_from_pdf(self, source: BinaryIO) -> str:
         """Extract text from PDF file"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            text_parts = []
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                page_text = page.extract_text()
-                if page_text.strip():
-                    # Add page number information
-                    text_parts.append(f"[Page {page_num}]\n{page_text}")
-            
-            full_text = "\n\n".join(text_parts)
+            # PDF parsing is CPU bound; run it in a worker thread to keep the event loop free
+            full_text = await asyncio.to_thread(self._read_pdf_text, source)
             
             if not full_text.strip():
                 raise HTTPException(
@@ -117,6 +140,8 @@ class FileProcessor:
             
             return full_text
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"❌ PDF extraction error: {e}")
             raise HTTPException(
@@ -124,22 +149,68 @@ class FileProcessor:
                 detail=f"Failed to extract text from PDF: {str(e)}"
             )
     
-    async def _extract_from_text(self, content: bytes) -> str:
+    def _read_pdf_text(self, source: BinaryIO) -> str:
+        """Extract page texts with PDFium, falling back to PyPDF2 if PDFium can't open the file"""
+        with _PDFIUM_LOCK:
+            full_text = self._read_pdf_text_pdfium(source)
+        if full_text is None:
+            source.seek(0)
+            return self._read_pdf_text_pypdf2(source)
+        return full_text
+    
+    def _read_pdf_text_pdfium(self, source: BinaryIO) -> Optional[str]:
+        """Extract page texts with PDFium; None if it can't open the file. Caller holds _PDFIUM_LOCK"""
+        try:
+            pdf = pdfium.PdfDocument(source)
+        except pdfium.PdfiumError as e:
+            logger.warning(f"⚠️ PDFium could not open PDF, falling back to PyPDF2: {e}")
+            return None
+        
+        try:
+            text_parts = []
+            for page_num, page in enumerate(pdf, 1):
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                if page_text.strip():
+                    # Add page number information
+                    text_parts.append(f"[Page {page_num}]\n{page_text}")
+            return "\n\n".join(text_parts)
+        finally:
+            pdf.close()
+    
+    def _read_pdf_text_pypdf2(self, source: BinaryIO) -> str:
+        """Extract page texts with PyPDF2"""
+        pdf_reader = PyPDF2.PdfReader(source)
+        text_parts = []
+        
+        for page_num, page in enumerate(pdf_reader.pages, 1):
+            page_text = page.extract_text()
+            if page_text.strip():
+                # Add page number information
+                text_parts.append(f"[Page {page_num}]\n{page_text}")
+        
+        return "\n\n".join(text_parts)
+    
+    async def _extract_from_text(self, file: UploadFile) -> str:
         """Extract text from TXT or Markdown file"""
         try:
-            # Try different encodings
-            for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                try:
-                    text = content.decode(encoding)
-                    return text
-                except UnicodeDecodeError:
-                    continue
-            
-            # If all encodings fail
-            raise HTTPException(
-                status_code=400, 
-                detail="Could not decode text file. Please ensure it's in UTF-8 format."
-            )
+            # Decode UTF-8 chunk by chunk so the raw bytes never sit in memory next to the text
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            text_parts = []
+            try:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    text_parts.append(decoder.decode(chunk))
+                text_parts.append(decoder.decode(b"", final=True))
+                return "".join(text_parts)
+            except UnicodeDecodeError:
+                text_parts.clear()
+            
+            # Not UTF-8: read it whole and let charset-normalizer detect the encoding
+            await file.seek(0)
+            content = await file.read()
+            return await asyncio.to_thread(self._detect_and_decode, content)
             
         except HTTPException:
             raise
@@ -150,6 +221,14 @@ class FileProcessor:
                 detail=f"Failed to extract text: {str(e)}"
             )
     
+    def _detect_and_decode(self, content: bytes) -> str:
+        """Decode bytes with the encoding charset-normalizer detects, or latin-1 if it finds none"""
+        match = from_bytes(content).best()
+        if match is None:
+            # latin-1 maps every byte, so undetectable files are still accepted as before
+            return content.decode("latin-1")
+        return str(match)
+    
     async def process_and_store(
         self, 
         file: UploadFile, 
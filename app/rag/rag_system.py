@@ -1,12 +1,21 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
+import hashlib
 import logging
+import time
+import tiktoken
 from .vector_db import text_chunker
+from app.services.doc_version import get_doc_version
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+NO_DOCUMENTS_RESPONSE = "I couldn't find any relevant information in your uploaded documents. Please make sure you've uploaded documents related to your question, or try rephrasing your query."
+ERROR_RESPONSE = "I apologize, but I encountered an error while processing your question. Please try again or contact support if the issue persists."
+
 class RAGSystem:
     """
     RAG (Retrieval Augmented Generation) system using Gemini LLM
@@ -20,6 +29,10 @@ class RAGSystem:
             google_api_key=settings.google_api_key
         )
         
+        # In-process LRU of finished answers: (user_id, document version, query digest) -> (expires_at, response)
+        self._response_cache: OrderedDict = OrderedDict()
+        self._response_cache_lock = asyncio.Lock()
+        
         # System prompt for RAG
         self.system_prompt = """
 You are an intelligent assistant that helps users find information from their uploaded documents. 
@@ -42,6 +55,18 @@ You are an intelligent assistant that helps users find information from their up
 - Provide supporting details from the documents
 - Include source references when available
 """
+        
+        # Tokenizer for budgeting conversation history, loaded on first use since it may have to be
+        # downloaded; an estimate is used if it can't be loaded
+        self._encoder = None
+        self._encoder_loaded = False
+        self._encoder_lock = asyncio.Lock()
+        
+        # Built once and shared by every request
+        self._system_msg = SystemMessage(content=self.system_prompt)
+        self._summary_system_msg = SystemMessage(
+            content="You are a document analysis assistant that creates helpful summaries."
+        )
 
     async def generate_response(
         self, 
@@ -53,127 +78,263 @@ You are an intelligent assistant that helps users find information from their up
         Generate response using RAG approach
         """
         try:
-            # Search for relevant documents
-            relevant_docs = await text_chunker.search_documents(
-                query=query,
-                user_id=user_id,
-                limit=settings.top_k_results
-            )
-            
-            if not relevant_docs:
+            # Answers that depend on conversation history are not reusable
+            cache_key = None if conversation_history else await self._response_cache_key(query, user_id)
+            if cache_key is not None:
+                cached = await self._get_cached_response(cache_key)
+                if cached is not None:
+                    logger.info(f"✅ Served cached RAG response for user {user_id}")
+                    return cached
+            
+            prepared = await self._prepare_generation(query, user_id, conversation_history)
+            if prepared is None:
                 return {
-                    "response": "I couldn't find any relevant information in your uploaded documents. Please make sure you've uploaded documents related to your question, or try rephrasing your query.",
+                    "response": NO_DOCUMENTS_RESPONSE,
                     "sources": [],
                     "confidence": "low"
                 }
-            
-            # Prepare context from retrieved documents
-            context = self._prepare_context(relevant_docs)
-            
-            # Prepare conversation history
-            messages = [SystemMessage(content=self.system_prompt)]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history[-10:]:  # Last 10 messages for context
-                    if msg.get("role") == "user":
-                        messages.append(HumanMessage(content=msg.get("content", "")))
-                    # Note: We could add AIMessage here for assistant responses if needed
-            
-            # Add current query with context
-            user_message = f"""
-**Context from your documents:**
-{context}
-
-**Your question:**
-{query}
-
-Please answer based on the provided context from your documents.
-"""
-            
-            messages.append(HumanMessage(content=user_message))
+            messages, sources, confidence, retrieved_chunks = prepared
             
             # Generate response using Gemini
             response = await self.gemini_llm.ainvoke(messages)
             
-            # Extract sources
-            sources = self._extract_sources(relevant_docs)
-            
-            # Determine confidence based on document relevance
-            confidence = self._calculate_confidence(relevant_docs)
-            
             logger.info(f"✅ Generated RAG response for user {user_id}")
             
-            return {
+            result = {
                 "response": response.content,
                 "sources": sources,
                 "confidence": confidence,
-                "retrieved_chunks": len(relevant_docs)
+                "retrieved_chunks": retrieved_chunks
             }
+            if cache_key is not None:
+                await self._cache_response(cache_key, result)
+            
+            return result
             
         except Exception as e:
             logger.error(f"❌ Error generating RAG response: {e}")
             return {
-                "response": "I apologize, but I encountered an error while processing your question. Please try again or contact support if the issue persists.",
+                "response": ERROR_RESPONSE,
                 "sources": [],
                 "confidence": "error",
                 "error": str(e)
             }
 
-    def _prepare_context(self, relevant_docs: List[Dict]) -> str:
-        """Prepare context string from retrieved documents"""
-        context_parts = []
-        
-        for i, doc in enumerate(relevant_docs, 1):
-            metadata = doc.get("metadata", {})
-            source_info = ""
+    async def generate_response_stream(
+        self, 
+        query: str, 
+        user_id: str, 
+        conversation_history: List[Dict] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Generate response using RAG approach, yielding the answer as Gemini produces it.
+        Emits a "sources" event, then "token" events, then "done" (or "error").
+        """
+        try:
+            # Answers that depend on conversation history are not reusable
+            cache_key = None if conversation_history else await self._response_cache_key(query, user_id)
+            if cache_key is not None:
+                cached = await self._get_cached_response(cache_key)
+                if cached is not None:
+                    logger.info(f"✅ Served cached RAG response for user {user_id}")
+                    for event in self._complete_events(cached):
+                        yield event
+                    return
             
-            # Add source information if available
-            if metadata.get("filename"):
-                source_info = f"[Source: {metadata.get('filename')}"
-                if metadata.get("page_number"):
-                    source_info += f", Page {metadata.get('page_number')}"
-                source_info += "]"
-            
-            context_part = f"""
-Document {i} {source_info}:
-{doc.get('text', '')}
----
+            prepared = await self._prepare_generation(query, user_id, conversation_history)
+            if prepared is None:
+                for event in self._complete_events({"response": NO_DOCUMENTS_RESPONSE, "sources": [], "confidence": "low"}):
+                    yield event
+                return
+            messages, sources, confidence, retrieved_chunks = prepared
+            
+            yield {
+                "type": "sources",
+                "sources": sources,
+                "confidence": confidence,
+                "retrieved_chunks": retrieved_chunks
+            }
+            
+            # Forward tokens as Gemini generates them
+            response_parts = []
+            async for chunk in self.gemini_llm.astream(messages):
+                if chunk.content:
+                    response_parts.append(chunk.content)
+                    yield {"type": "token", "content": chunk.content}
+            
+            logger.info(f"✅ Streamed RAG response for user {user_id}")
+            
+            if cache_key is not None:
+                await self._cache_response(cache_key, {
+                    "response": "".join(response_parts),
+                    "sources": sources,
+                    "confidence": confidence,
+                    "retrieved_chunks": retrieved_chunks
+                })
+            yield {"type": "done"}
+            
+        except Exception as e:
+            logger.error(f"❌ Error streaming RAG response: {e}")
+            yield {"type": "error", "message": ERROR_RESPONSE}
+
+    def _complete_events(self, result: Dict) -> List[Dict]:
+        """Stream events for an answer that is already complete"""
+        return [
+            {
+                "type": "sources",
+                "sources": result["sources"],
+                "confidence": result["confidence"],
+                "retrieved_chunks": result.get("retrieved_chunks", 0)
+            },
+            {"type": "token", "content": result["response"]},
+            {"type": "done"}
+        ]
+
+    async def _prepare_generation(
+        self, 
+        query: str, 
+        user_id: str, 
+        conversation_history: Optional[List[Dict]]
+    ) -> Optional[Tuple[List, List[Dict], str, int]]:
+        """Retrieve documents and build the LLM messages; None if nothing relevant was found"""
+        # Search for relevant documents
+        relevant_docs = await text_chunker.search_documents(
+            query=query,
+            user_id=user_id,
+            limit=settings.top_k_results
+        )
+        
+        if not relevant_docs:
+            return None
+        
+        # Prepare context, sources and confidence from retrieved documents in one pass
+        context, sources, confidence = self._process_docs(relevant_docs)
+        
+        # Prepare conversation history
+        messages = [self._system_msg]
+        
+        # Add conversation history if provided, newest messages first until the token budget is spent
+        if conversation_history:
+            encoder = await self._get_encoder()
+            history_messages = []
+            budget = settings.history_token_budget
+            for msg in reversed(conversation_history):
+                if msg.get("role") != "user":
+                    continue  # Note: We could add AIMessage here for assistant responses if needed
+                content = msg.get("content", "")
+                budget -= self._count_tokens(content, encoder)
+                if budget < 0:
+                    break
+                history_messages.append(HumanMessage(content=content))
+            messages.extend(reversed(history_messages))
+        
+        # Add current query with context
+        user_message = f"""
+**Context from your documents:**
+{context}
+
+**Your question:**
+{query}
+
+Please answer based on the provided context from your documents.
 """
-            context_parts.append(context_part)
         
-        return "\n".join(context_parts)
+        messages.append(HumanMessage(content=user_message))
+        return messages, sources, confidence, len(relevant_docs)
+
+    async def _get_encoder(self):
+        """The tiktoken encoding, loaded once in a worker thread; None if it can't be loaded"""
+        if not self._encoder_loaded:
+            async with self._encoder_lock:
+                if not self._encoder_loaded:
+                    try:
+                        self._encoder = await asyncio.to_thread(tiktoken.encoding_for_model, "gpt-4o")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Could not load tiktoken encoding, estimating history tokens: {e}")
+                    self._encoder_loaded = True
+        return self._encoder
+
+    def _count_tokens(self, text: str, encoder) -> int:
+        """Number of tokens in text, roughly 4 characters per token without tiktoken"""
+        if encoder is None:
+            return len(text) // 4 + 1
+        return len(encoder.encode_ordinary(text))
+
+    async def _response_cache_key(self, query: str, user_id: str) -> Optional[Tuple[str, str, bytes]]:
+        """Cache key for a question; None when the user's document version can't be read"""
+        doc_version = await get_doc_version(user_id)
+        if doc_version is None:
+            return None
+        digest = hashlib.blake2b(
+            f"{query.strip().lower()}\x00{settings.top_k_results}".encode(),
+            digest_size=16
+        ).digest()
+        # Any upload or delete, in any process, bumps the version and orphans older entries
+        return user_id, doc_version, digest
+
+    async def _get_cached_response(self, cache_key: Tuple[str, str, bytes]) -> Optional[Dict]:
+        """Return a fresh cached response, dropping it if expired"""
+        async with self._response_cache_lock:
+            entry = self._response_cache.get(cache_key)
+            if entry is None:
+                return None
+            
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._response_cache[cache_key]
+                return None
+            
+            self._response_cache.move_to_end(cache_key)
+            return response
+
+    async def _cache_response(self, cache_key: Tuple[str, str, bytes], response: Dict):
+        """Store a response, evicting the least recently used entries beyond the limit"""
+        async with self._response_cache_lock:
+            self._response_cache[cache_key] = (time.monotonic() + settings.rag_cache_ttl_seconds, response)
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > settings.rag_cache_max_entries:
+                self._response_cache.popitem(last=False)
 
-    def _extract_sources(self, relevant_docs: List[Dict]) -> List[Dict]:
-        """Extract source information from relevant documents"""
+    def _process_docs(self, relevant_docs: List[Dict]) -> Tuple[str, List[Dict], str]:
+        """Build the context string, deduplicated sources and confidence level in a single pass"""
+        context_parts = []
+        append_context = context_parts.append
         sources = []
         seen_sources = set()
+        score_total = 0
         
-        for doc in relevant_docs:
-            metadata = doc.get("metadata", {})
-            filename = metadata.get("filename", "Unknown")
+        for i, doc in enumerate(relevant_docs, 1):
+            metadata = doc.get("metadata") or {}
+            filename = metadata.get("filename")
+            page_number = metadata.get("page_number")
+            chunk_index = metadata.get("chunk_index")
+            score = doc.get("score", 0)
+            score_total += score
+            
+            # Add source information if available
+            source_info = ""
+            if filename:
+                source_info = f"[Source: {filename}, Page {page_number}]" if page_number else f"[Source: {filename}]"
+            
+            append_context(f"\nDocument {i} {source_info}:\n{doc.get('text', '')}\n---\n")
             
             # Avoid duplicate sources
-            source_key = f"{filename}_{metadata.get('chunk_index', 0)}"
+            source_key = (filename or "Unknown", chunk_index or 0)
             if source_key not in seen_sources:
                 sources.append({
-                    "filename": filename,
-                    "chunk_index": metadata.get("chunk_index"),
-                    "page_number": metadata.get("page_number"),
-                    "score": doc.get("score", 0),
+                    "filename": filename or "Unknown",
+                    "chunk_index": chunk_index,
+                    "page_number": page_number,
+                    "score": score,
                     "upload_date": metadata.get("upload_date")
                 })
                 seen_sources.add(source_key)
         
-        return sources
+        confidence = self._confidence_level(score_total / len(relevant_docs)) if relevant_docs else "low"
+        return "\n".join(context_parts), sources, confidence
 
-    def _calculate_confidence(self, relevant_docs: List[Dict]) -> str:
-        """Calculate confidence level based on document relevance scores"""
-        if not relevant_docs:
-            return "low"
-        
-        avg_score = sum(doc.get("score", 0) for doc in relevant_docs) / len(relevant_docs)
-        
+    def _confidence_level(self, avg_score: float) -> str:
+        """Map an average relevance score to a confidence level"""
         if avg_score >= 0.85:
             return "high"
         elif avg_score >= 0.7:
@@ -200,7 +361,7 @@ Provide a structured summary that helps the user understand what information is
 """
             
             messages = [
-                SystemMessage(content="You are a document analysis assistant that creates helpful summaries."),
+                self._summary_system_msg,
                 HumanMessage(content=summary_prompt)
             ]
             
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class _ScopeEntries:
+    """Cached query embeddings and their search results for one scope"""
+
+    def __init__(self, dim: int):
+        self.embeddings = np.empty((0, dim), dtype=np.float32)
+        self.results: List[List[Dict]] = []
+        self.expires_at = np.empty(0, dtype=np.float64)
+        self.last_used = np.empty(0, dtype=np.float64)
+
+    def remove(self, keep: np.ndarray):
+        """Keep only the rows selected by the boolean mask"""
+        self.embeddings = self.embeddings[keep]
+        self.expires_at = self.expires_at[keep]
+        self.last_used = self.last_used[keep]
+        self.results = [r for r, k in zip(self.results, keep) if k]
+
+class SemanticCache:
+    """
+    Search results keyed by query embedding; a new query reuses the results of a
+    cached one when their cosine similarity reaches the threshold.
+    Scopes are (collection_name, user_id, limit, document version) tuples.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int, max_scopes: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[Hashable, _ScopeEntries]" = OrderedDict()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope: Hashable, embedding: List[float]) -> Optional[List[Dict]]:
+        """Results of the most similar cached query in the scope, if similar enough"""
+        entries = self._scopes.get(scope)
+        if entries is None or not entries.results:
+            return None
+        self._scopes.move_to_end(scope)
+
+        now = time.monotonic()
+        fresh = entries.expires_at > now
+        if not fresh.all():
+            entries.remove(fresh)
+            if not entries.results:
+                return None
+
+        # Rows are unit vectors, so one matrix-vector product gives every cosine similarity
+        similarities = entries.embeddings @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        entries.last_used[best] = now
+        logger.debug(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+        return list(entries.results[best])
+
+    def store(self, scope: Hashable, embedding: List[float], results: List[Dict]):
+        """Cache the results of a query, evicting the least recently used entry if full"""
+        vector = self._normalize(embedding)
+        entries = self._scopes.get(scope)
+        if entries is None or entries.embeddings.shape[1] != vector.shape[0]:
+            entries = self._scopes[scope] = _ScopeEntries(vector.shape[0])
+        self._scopes.move_to_end(scope)
+
+        now = time.monotonic()
+        if len(entries.results) >= self.max_entries:
+            keep = np.ones(len(entries.results), dtype=bool)
+            keep[int(np.argmin(entries.last_used))] = False
+            entries.remove(keep)
+
+        entries.embeddings = np.vstack([entries.embeddings, vector])
+        entries.expires_at = np.append(entries.expires_at, now + self.ttl_seconds)
+        entries.last_used = np.append(entries.last_used, now)
+        entries.results.append(list(results))
+
+        while len(self._scopes) > self.max_scopes:
+            self._scopes.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop the scopes of a user whose documents changed, or everything"""
+        if user_id is None:
+            self._scopes.clear()
+            return
+        for scope in [scope for scope in self._scopes if scope[1] == user_id]:
+            del self._scopes[scope]
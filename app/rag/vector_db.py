@@ -1,24 +1,124 @@
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.models import PointStruct, VectorParams, Distance
+from qdrant_client.http.exceptions import UnexpectedResponse
 import asyncio
+import grpc
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from qdrant_client.models import Filter, FilterSelector, FieldCondition, MatchValue
+from qdrant_client.models import Filter, FilterSelector, FieldCondition, MatchAny, MatchValue
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain.text_splitter import MarkdownHeaderTextSplitter, CharacterTextSplitter
 from langchain.schema import Document
-from langchain_community.vectorstores import Qdrant
 from langchain_openai import ChatOpenAI
+from collections import Counter, OrderedDict
+from functools import lru_cache
 import os
 from app.config import settings
+from app.services.doc_version import bump_doc_version, get_doc_version
+from .semantic_cache import SemanticCache
+from .batching import MicroBatcher
 import sys
 import logging
-import uuid
+import re
+import secrets
+import hashlib
+import numpy as np
 
 load_dotenv(override=True)
 
+# Chunking methods are stored in point payloads as small ints
+CHUNKING_METHOD_CODES = {"recursive": 0, "semantic": 1, "character": 2, "markdown": 3}
+
+# Qdrant point ids are unsigned 64-bit; keep them within the signed range for other clients
+_POINT_ID_MASK = (1 << 63) - 1
+
+# Terms for the keyword branch of hybrid search; stopwords would match nearly every chunk
+_KEYWORD_TOKEN_RE = re.compile(r"\w{3,}")
+_KEYWORD_STOPWORDS = frozenset({
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was",
+    "one", "our", "out", "has", "have", "his", "how", "its", "who", "what", "when", "where",
+    "which", "why", "with", "this", "that", "these", "those", "from", "they", "them", "their",
+    "there", "been", "were", "will", "would", "should", "could", "about", "into", "does", "did",
+    "your", "yours", "tell", "please", "give", "show", "find", "document", "documents"
+})
+
+# Chunks carry a BM25 term-frequency sparse vector; Qdrant applies IDF over the whole collection
+SPARSE_VECTOR_NAME = "bm25"
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_BM25_AVG_DOC_LENGTH = 256  # tokens; a fixed estimate keeps stored vectors independent of the corpus
+
+def _keyword_terms(text: str) -> List[str]:
+    """Lowercased terms of a text, without stopwords"""
+    return [term for term in _KEYWORD_TOKEN_RE.findall(text.lower()) if term not in _KEYWORD_STOPWORDS]
+
+@lru_cache(maxsize=65536)
+def _term_index(term: str) -> int:
+    """Stable sparse-vector dimension for a term"""
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=4).digest(), "big")
+
+def _bm25_document_vector(text: str) -> models.SparseVector:
+    """BM25 term-frequency weights of a chunk"""
+    terms = _keyword_terms(text)
+    length_norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * len(terms) / _BM25_AVG_DOC_LENGTH)
+    weights = {}
+    for term, tf in Counter(terms).items():
+        # Distinct terms hashing to the same index share it
+        index = _term_index(term)
+        weights[index] = weights.get(index, 0.0) + tf * (_BM25_K1 + 1) / (tf + length_norm)
+    return models.SparseVector(indices=list(weights), values=list(weights.values()))
+
+def _bm25_query_vector(query: str) -> Optional[models.SparseVector]:
+    """Sparse vector of the query terms, None if it has no searchable term"""
+    indices = list(dict.fromkeys(_term_index(term) for term in _keyword_terms(query)))
+    if not indices:
+        return None
+    return models.SparseVector(indices=indices, values=[1.0] * len(indices))
+
+def _is_missing_collection(error: Exception) -> bool:
+    """Whether a Qdrant error means the collection doesn't exist (REST 404 or gRPC NOT_FOUND)"""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    return isinstance(error, grpc.RpcError) and error.code() == grpc.StatusCode.NOT_FOUND
+
+def _dense_vector(point) -> List[float]:
+    """Embedding of a search hit returned with its default (unnamed) vector"""
+    vector = point.vector
+    return vector.get("", []) if isinstance(vector, dict) else vector
+
+# Document summaries page through a user's points reading only these payload fields
+SUMMARY_PAGE_SIZE = 1000
+SUMMARY_PAYLOAD_FIELDS = [
+    "metadata.filename", "metadata.file_type", "metadata.upload_date", "metadata.chunk_size"
+]
+
+@lru_cache(maxsize=1024)
+def _match_filter(key: str, value: str) -> Filter:
+    """Filter matching one payload field; cached since the same user/file filters repeat"""
+    return Filter(
+        must=[
+            FieldCondition(
+                key=key,
+                match=MatchValue(value=value)
+            )
+        ]
+    )
+
+def _match_any_filter(key: str, values: List[str]) -> Filter:
+    """Filter matching a payload field against any of several values"""
+    if len(values) == 1:
+        return _match_filter(key, values[0])
+    return Filter(
+        must=[
+            FieldCondition(
+                key=key,
+                match=MatchAny(any=list(values))
+            )
+        ]
+    )
+
 # Setup logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,7 +126,7 @@ logger = logging.getLogger(__name__)
 class TextChunker:
     """
     Handles text chunking and metadata enrichment for document processing.
-    Uses Document objects with Qdrant vectorstore (file_b style) while retaining file_a functionality.
+    Stores Document objects in Qdrant using the langchain payload layout (file_b style) while retaining file_a functionality.
     """
 
     def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
@@ -35,15 +135,45 @@ class TextChunker:
         self.embedding_model = OpenAIEmbeddings(model='text-embedding-ada-002', api_key=settings.openai_api_key)
         self.openai_llm = ChatOpenAI(model="gpt-4o", temperature=0.4)
         self.collection_name = settings.collection_name
+        self._initialized = False
+        # Collections created before hybrid search have no sparse vector and can't gain one
+        self._sparse_enabled = False
+        # LRU of query string -> embedding, so repeated questions skip the OpenAI call
+        self._embed_cache: OrderedDict = OrderedDict()
+        self._embed_cache_size = settings.embedding_cache_max_entries
+        # Search the quantized vectors, then rescore an oversampled candidate set with the originals
+        self._search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+        )
+        # Concurrent query embeddings go out as one embed_documents call
+        self._embedding_batcher = MicroBatcher(
+            self._run_embedding_batch,
+            max_wait=settings.embedding_batch_wait_ms / 1000,
+            max_size=settings.embedding_batch_max_size
+        )
+        # Concurrent searches against the same collection go out as one search_batch call
+        self._search_batcher = MicroBatcher(
+            self._run_search_batch,
+            max_wait=settings.search_batch_wait_ms / 1000,
+            max_size=settings.search_batch_max_size
+        )
+        self.semantic_cache = SemanticCache(
+            threshold=settings.semantic_cache_threshold,
+            ttl_seconds=settings.semantic_cache_ttl_seconds,
+            max_entries=settings.semantic_cache_max_entries,
+            max_scopes=settings.semantic_cache_max_scopes
+        )
 
         # Initialize Qdrant client
+        qdrant_options = {
+            "url": settings.qdrant_url,
+            "prefer_grpc": settings.qdrant_prefer_grpc,
+            "grpc_port": settings.qdrant_grpc_port,
+            "timeout": settings.qdrant_timeout
+        }
         if settings.qdrant_api_key:
-            self.qdrant_client = QdrantClient(
-                url=settings.qdrant_url,
-                api_key=settings.qdrant_api_key
-            )
-        else:
-            self.qdrant_client = QdrantClient(url=settings.qdrant_url)
+            qdrant_options["api_key"] = settings.qdrant_api_key
+        self.qdrant_client = AsyncQdrantClient(**qdrant_options)
 
         # Initialize multiple text splitters (from file_b)
         self.SemanticChunk_splitter = SemanticChunker(
@@ -69,38 +199,73 @@ class TextChunker:
             ("##", "section"),
         ])
 
-        # Initialize Qdrant vectorstore with the new import (file_b style)
-        self.vectorstore = Qdrant(
-            client=self.qdrant_client,
-            collection_name=self.collection_name,
-            embeddings=self.embedding_model
-        )
-
     async def initialize_collection(self) -> bool:
         """Initialize Qdrant collection if it doesn't exist"""
+        # Only the first call per process has to talk to Qdrant
+        if self._initialized:
+            return True
+        
         try:
             # Check if collection exists
-            collection_exists = self.qdrant_client.collection_exists(collection_name=self.collection_name)
+            collection_exists = await self.qdrant_client.collection_exists(collection_name=self.collection_name)
             
             if not collection_exists:
                 # Create collection
-                self.qdrant_client.create_collection(
+                await self.qdrant_client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=settings.vector_size,
                         distance=Distance.COSINE
-                    )
+                    ),
+                    sparse_vectors_config={
+                        SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+                    },
+                    # int8 copies of the vectors stay in RAM for the HNSW search; originals rescore the top hits
+                    quantization_config=models.ScalarQuantization(
+                        scalar=models.ScalarQuantizationConfig(
+                            type=models.ScalarType.INT8,
+                            always_ram=True
+                        )
+                    ),
+                    hnsw_config=models.HnswConfigDiff(m=32, ef_construct=256)
                 )
                 logger.info(f"✅ Created collection: {self.collection_name}")
+                self._sparse_enabled = True
             else:
                 logger.info(f"✅ Collection already exists: {self.collection_name}")
+                collection_info = await self.qdrant_client.get_collection(self.collection_name)
+                sparse_vectors = collection_info.config.params.sparse_vectors or {}
+                self._sparse_enabled = SPARSE_VECTOR_NAME in sparse_vectors
+                if not self._sparse_enabled:
+                    logger.warning(
+                        f"⚠️ Collection {self.collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                        "keyword search is off until it is recreated"
+                    )
             
+            # Creating an existing index is a no-op, so older collections pick them up too
+            await self._create_payload_indexes()
+            
+            self._initialized = True
             return True
             
         except Exception as e:
             logger.error(f"❌ Error initializing collection: {e}")
             return False
 
+    async def _create_payload_indexes(self):
+        """Index the payload fields used by filters"""
+        keyword_fields = ["metadata.user_id", "metadata.file_name", "metadata.website_url"]
+        await asyncio.gather(
+            *(
+                self.qdrant_client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+                for field_name in keyword_fields
+            )
+        )
+
     async def chunk_text(self, text: str, metadata: Dict = None, chunking_method: str = "recursive") -> List[Document]:
         """
         Chunk text into smaller pieces with metadata using Document objects
@@ -113,22 +278,30 @@ class TextChunker:
         try:
             # Select chunking method
             if chunking_method == "semantic":
-                chunks = self.SemanticChunk_splitter.split_text(text)
+                splitter = self.SemanticChunk_splitter
             elif chunking_method == "character":
-                chunks = self.Character_splitter.split_text(text)
+                splitter = self.Character_splitter
             elif chunking_method == "markdown":
-                chunks = self.markdown_splitter.split_text(text)
+                splitter = self.markdown_splitter
             else:  # default recursive
-                chunks = self.text_splitter.split_text(text)
+                splitter = self.text_splitter
+            
+            # Splitting large documents takes a while; keep it off the event loop
+            chunks = await asyncio.to_thread(splitter.split_text, text)
+            
+            # Document-level fields are the same for every chunk; unset ones aren't stored at all
+            base_metadata = {key: value for key, value in (metadata or {}).items() if value is not None}
+            method_code = CHUNKING_METHOD_CODES.get(chunking_method, CHUNKING_METHOD_CODES["recursive"])
+            total_chunks = len(chunks)
             
             documents = []
             for i, chunk in enumerate(chunks):
                 chunk_metadata = {
                     "chunk_index": i,
-                    "total_chunks": len(chunks),
+                    "total_chunks": total_chunks,
                     "chunk_size": len(chunk),
-                    "chunking_method": chunking_method,
-                    **(metadata or {})
+                    "chunking_method": method_code,
+                    **base_metadata
                 }
                 
                 documents.append(Document(
@@ -143,9 +316,20 @@ class TextChunker:
             logger.error(f"❌ Error chunking text: {e}")
             return []
 
+    def _point_vectors(self, text: str, dense_vector: List[float]):
+        """Vectors of a new point: the embedding, plus BM25 weights when the collection has them"""
+        if not self._sparse_enabled:
+            return dense_vector
+        return {"": dense_vector, SPARSE_VECTOR_NAME: _bm25_document_vector(text)}
+
+    async def _documents_changed(self, user_id: Optional[str] = None):
+        """Drop cached searches here and bump the shared version other processes key their caches on"""
+        self.semantic_cache.invalidate(user_id)
+        await bump_doc_version(user_id)
+
     async def store_documents(self, documents: List[Document], user_id: str = None) -> bool:
         """
-        Store documents in Qdrant vector database using vectorstore
+        Embed documents and upsert them into the Qdrant vector database
         """
         try:
             await self.initialize_collection()
@@ -154,10 +338,36 @@ class TextChunker:
             if user_id:
                 for doc in documents:
                     doc.metadata["user_id"] = user_id
-                    doc.metadata["point_id"] = str(uuid.uuid4())
             
-            # Store using vectorstore (file_b style)
-            self.vectorstore.add_documents(documents)
+            # Random 63-bit integer point ids, drawn from the OS in one call for the whole upload
+            id_bytes = secrets.token_bytes(8 * len(documents))
+            point_ids = [
+                int.from_bytes(id_bytes[i:i + 8], "big") & _POINT_ID_MASK
+                for i in range(0, len(id_bytes), 8)
+            ]
+            
+            batch_size = settings.ingest_batch_size
+            batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+            id_batches = [point_ids[i:i + batch_size] for i in range(0, len(point_ids), batch_size)]
+            
+            # Embedding batches are independent OpenAI requests, so send them concurrently
+            batch_vectors = await asyncio.gather(*(
+                asyncio.to_thread(self.embedding_model.embed_documents, [doc.page_content for doc in batch])
+                for batch in batches
+            ))
+            
+            try:
+                await self._upsert_batches(id_batches, batches, batch_vectors)
+            except Exception as e:
+                if not _is_missing_collection(e):
+                    raise
+                # Another process dropped the collection after this one initialized it
+                logger.warning(f"⚠️ Collection {self.collection_name} is gone, recreating it: {e}")
+                self._initialized = False
+                if not await self.initialize_collection():
+                    raise
+                await self._upsert_batches(id_batches, batches, batch_vectors)
+            await self._documents_changed(user_id)
             
             logger.info(f"✅ Stored {len(documents)} documents in vector database")
             return True
@@ -166,6 +376,25 @@ class TextChunker:
             logger.error(f"❌ Error storing documents: {e}")
             return False
 
+    async def _upsert_batches(self, id_batches: List[List[int]], batches: List[List[Document]],
+                              batch_vectors: List[List[List[float]]]):
+        """Upsert embedded document batches concurrently"""
+        # Same payload layout the langchain vectorstore used (file_b style)
+        await asyncio.gather(*(
+            self.qdrant_client.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    PointStruct(
+                        id=point_id,
+                        vector=self._point_vectors(doc.page_content, vector),
+                        payload={"page_content": doc.page_content, "metadata": doc.metadata}
+                    )
+                    for point_id, doc, vector in zip(ids, batch, vectors)
+                ]
+            )
+            for ids, batch, vectors in zip(id_batches, batches, batch_vectors)
+        ))
+
     async def process_and_store_pdf(self, text: str, file_name: str, website_url: str = None, 
                                   tag: str = None, title: str = None, user_id: str = None) -> Dict:
         """
@@ -234,19 +463,13 @@ class TextChunker:
         try:
             # 1. Delete existing documents with matching filename
             try:
-                self.qdrant_client.delete(
+                await self.qdrant_client.delete(
                     collection_name=self.collection_name,
                     points_selector=FilterSelector(
-                        filter=Filter(
-                            must=[
-                                FieldCondition(
-                                    key="metadata.file_name",
-                                    match=MatchValue(value=file_name)
-                                )
-                            ]
-                        )
+                        filter=_match_filter("metadata.file_name", file_name)
                     )
                 )
+                await self._documents_changed()
                 logger.info(f"✅ Deleted existing documents for file: {file_name}")
             except Exception as e:
                 logger.error(f"Error deleting existing documents: {str(e)}")
@@ -276,6 +499,31 @@ class TextChunker:
             logger.error(f"Error updating documents: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    async def _run_search_batch(self, collection_name: str, requests: List[models.SearchRequest]) -> List[List]:
+        """Run queued searches for one collection in a single request"""
+        return await self.qdrant_client.search_batch(
+            collection_name=collection_name,
+            requests=requests
+        )
+
+    async def _run_embedding_batch(self, _, texts: List[str]) -> List[List[float]]:
+        """Embed queued query strings in a single OpenAI request"""
+        return await asyncio.to_thread(self.embedding_model.embed_documents, texts)
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the vector of an identical earlier query"""
+        key = query.strip()
+        embedding = self._embed_cache.get(key)
+        if embedding is not None:
+            self._embed_cache.move_to_end(key)
+            return embedding
+        
+        embedding = await self._embedding_batcher.submit(None, key)
+        self._embed_cache[key] = embedding
+        if len(self._embed_cache) > self._embed_cache_size:
+            self._embed_cache.popitem(last=False)
+        return embedding
+
     async def search_documents(self, query: str, user_id: str = None, limit: int = 5, 
                              collection_name: str = None) -> List[Dict]:
         """
@@ -286,35 +534,50 @@ class TextChunker:
             collection_name = collection_name or self.collection_name
             
             # Generate query embedding
-            query_embedding = await asyncio.to_thread(
-                self.embedding_model.embed_query, query
-            )
+            query_embedding = await self._embed_query(query)
+            
+            # A semantically equivalent question asked recently reuses its results. The scope carries
+            # the shared document version, so uploads and deletes in other processes (Celery workers,
+            # other API workers) retire it; unscoped searches and unreadable versions skip the cache.
+            doc_version = await get_doc_version(user_id) if user_id else None
+            cache_scope = (collection_name, user_id, limit, doc_version) if doc_version else None
+            if cache_scope is not None:
+                cached_results = self.semantic_cache.lookup(cache_scope, query_embedding)
+                if cached_results is not None:
+                    logger.debug("Found %d similar documents (cached)", len(cached_results))
+                    return cached_results
             
             # Prepare filter for user-specific search
-            search_filter = None
-            if user_id:
-                search_filter = Filter(
-                    must=[
-                        FieldCondition(
-                            key="metadata.user_id",
-                            match=MatchValue(value=user_id)
-                        )
-                    ]
-                )
+            search_filter = _match_filter("metadata.user_id", user_id) if user_id else None
             
             # Search in Qdrant
-            search_results = self.qdrant_client.search(
-                collection_name=collection_name,
-                query_vector=query_embedding,
-                
-                limit=limit,
-                score_threshold=getattr(settings, 'similarity_threshold', 0.7)
-            ) #query_filter=search_filter,
-            print('➡ search_results:', search_results)
+            dense_search = self._search_batcher.submit(
+                collection_name,
+                models.SearchRequest(
+                    vector=query_embedding,
+                    filter=search_filter,
+                    limit=limit,
+                    score_threshold=getattr(settings, 'similarity_threshold', 0.7),
+                    params=self._search_params,
+                    with_payload=True
+                )
+            )
+            
+            # Dense and keyword retrieval are independent, so run them concurrently; the first
+            # search in a process has to learn whether the collection carries BM25 vectors
+            if settings.hybrid_search_enabled and not self._initialized:
+                await self.initialize_collection()
+            if settings.hybrid_search_enabled and self._sparse_enabled and collection_name == self.collection_name:
+                search_results, keyword_results = await asyncio.gather(
+                    dense_search,
+                    self._keyword_search(query, query_embedding, collection_name, search_filter, limit)
+                )
+            else:
+                search_results, keyword_results = await dense_search, []
             
             # Format results
             results = []
-            for result in search_results:
+            for result in self._fuse_results(search_results, keyword_results, limit):
                 # Handle both payload structures (file_a and file_b compatibility)
                 content = result.payload.get("page_content") or result.payload.get("text", "")
                 metadata = result.payload.get("metadata", result.payload)
@@ -325,13 +588,111 @@ class TextChunker:
                     "score": result.score
                 })
             
-            logger.info(f"✅ Found {len(results)} similar documents")
+            # Empty results aren't cached so newly uploaded documents show up right away
+            if results and cache_scope is not None:
+                self.semantic_cache.store(cache_scope, query_embedding, results)
+            
+            logger.debug("Found %d similar documents", len(results))
             return results
             
         except Exception as e:
             logger.error(f"❌ Error searching documents: {e}")
             return []
 
+    async def _keyword_search(self, query: str, query_embedding: List[float], collection_name: str,
+                              search_filter: Optional[Filter], limit: int) -> List:
+        """
+        Rank chunks by BM25 over the whole collection. Each hit is rescored with its cosine similarity
+        to the query, so keyword hits face the same threshold and report the same score as dense ones.
+        """
+        query_vector = _bm25_query_vector(query)
+        if query_vector is None:
+            return []
+        
+        try:
+            candidates = await self._search_batcher.submit(
+                collection_name,
+                models.SearchRequest(
+                    vector=models.NamedSparseVector(name=SPARSE_VECTOR_NAME, vector=query_vector),
+                    filter=search_filter,
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=[""]
+                )
+            )
+        except Exception as e:
+            # Dense results are still usable on their own
+            logger.warning(f"⚠️ Keyword search failed: {e}")
+            return []
+        
+        if not candidates:
+            return []
+        
+        dense_vectors = np.asarray([_dense_vector(point) for point in candidates], dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        similarities = (dense_vectors @ query_vector) / (
+            np.linalg.norm(dense_vectors, axis=1) * np.linalg.norm(query_vector) + 1e-12
+        )
+        threshold = getattr(settings, 'similarity_threshold', 0.7)
+        return [
+            point.model_copy(update={"score": float(similarity), "vector": None})
+            for point, similarity in zip(candidates, similarities)
+            if similarity >= threshold
+        ]
+
+    def _fuse_results(self, dense_results: List, keyword_results: List, limit: int) -> List:
+        """Merge dense and keyword rankings with reciprocal rank fusion; scores stay cosine similarities"""
+        if not keyword_results:
+            return dense_results
+        
+        fused_scores = {}
+        points = {}
+        for ranking in (dense_results, keyword_results):
+            for rank, point in enumerate(ranking):
+                fused_scores[point.id] = fused_scores.get(point.id, 0.0) + 1.0 / (settings.rrf_k + rank + 1)
+                points.setdefault(point.id, point)
+        
+        ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)
+        return [points[point_id] for point_id in ranked_ids[:limit]]
+
+    async def get_user_summary(self, user_id: str) -> Dict:
+        """Aggregate a user's chunks per file, fetching only the metadata fields the summary needs"""
+        file_types = Counter()
+        unique_files = set()
+        upload_dates = set()
+        total_chunks = 0
+        total_characters = 0
+        
+        offset = None
+        while True:
+            points, offset = await self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=_match_filter("metadata.user_id", user_id),
+                limit=SUMMARY_PAGE_SIZE,
+                offset=offset,
+                with_payload=SUMMARY_PAYLOAD_FIELDS,
+                with_vectors=False
+            )
+            for point in points:
+                metadata = point.payload.get("metadata") or {}
+                file_types[metadata.get("file_type", "unknown")] += 1
+                unique_files.add(metadata.get("filename", "unknown"))
+                total_characters += metadata.get("chunk_size", 0)
+                upload_date = metadata.get("upload_date")
+                if upload_date:
+                    upload_dates.add(upload_date)
+            total_chunks += len(points)
+            if offset is None:
+                break
+        
+        return {
+            "total_documents": len(unique_files),
+            "total_chunks": total_chunks,
+            "file_types": dict(file_types),
+            "total_characters": total_characters,
+            "upload_dates": sorted(upload_dates)
+        }
+
     async def search_QnA_chunks(self, query: str, collection_name: str = None, top_k: int = 5) -> List[Dict]:
         """
         Search for most relevant chunks for Q&A (file_b compatibility)
@@ -350,22 +711,23 @@ class TextChunker:
 
     async def delete_user_documents(self, user_id: str) -> bool:
         """Delete all documents for a specific user"""
+        return await self.delete_documents_for_users([user_id])
+
+    async def delete_documents_for_users(self, user_ids: List[str]) -> bool:
+        """Delete all documents for several users with a single request"""
+        if not user_ids:
+            return True
+        
         try:
-            self.qdrant_client.delete(
+            await self.qdrant_client.delete(
                 collection_name=self.collection_name,
                 points_selector=FilterSelector(
-                    filter=Filter(
-                        must=[
-                            FieldCondition(
-                                key="metadata.user_id",
-                                match=MatchValue(value=user_id)
-                            )
-                        ]
-                    )
+                    filter=_match_any_filter("metadata.user_id", user_ids)
                 )
             )
+            await asyncio.gather(*(self._documents_changed(user_id) for user_id in user_ids))
             
-            logger.info(f"✅ Deleted documents for user: {user_id}")
+            logger.info(f"✅ Deleted documents for users: {', '.join(user_ids)}")
             return True
             
         except Exception as e:
@@ -380,38 +742,50 @@ class TextChunker:
             file_identifier: The identifier value (filename or website_url)
             identifier_type: Type of identifier ("file_name" or "website_url")
         """
+        return await self.delete_documents_by_filenames([file_identifier], identifier_type)
+
+    async def delete_documents_by_filenames(self, file_identifiers: List[str], identifier_type: str = "file_name") -> Dict:
+        """
+        Delete documents for several filenames or website_urls with a single request
+        
+        Args:
+            file_identifiers: The identifier values (filenames or website_urls)
+            identifier_type: Type of identifier ("file_name" or "website_url")
+        """
+        if not file_identifiers:
+            return {
+                "success": True,
+                "message": f"No {identifier_type} given, nothing deleted"
+            }
+        identifiers = ", ".join(file_identifiers)
+        
         try:
-            self.qdrant_client.delete(
+            await self.qdrant_client.delete(
                 collection_name=self.collection_name,
                 points_selector=FilterSelector(
-                    filter=Filter(
-                        must=[
-                            FieldCondition(
-                                key=f"metadata.{identifier_type}",
-                                match=MatchValue(value=file_identifier)
-                            )
-                        ]
-                    )
+                    filter=_match_any_filter(f"metadata.{identifier_type}", file_identifiers)
                 )
             )
+            await self._documents_changed()
 
             return {
                 "success": True,
-                "message": f"Deleted documents for {identifier_type}: {file_identifier}"
+                "message": f"Deleted documents for {identifier_type}: {identifiers}"
             }
         except Exception as e:
             return {
                 "success": False,
-                "message": f"Error deleting documents for '{file_identifier}': {str(e)}"
+                "message": f"Error deleting documents for '{identifiers}': {str(e)}"
             }
 
     async def clear_all_data(self) -> Dict:
         """Clear all data from the collection"""
         try:
-            self.qdrant_client.delete(
+            await self.qdrant_client.delete(
                 collection_name=self.collection_name,
                 points_selector=FilterSelector(filter=Filter())
             )
+            await self._documents_changed()
             return {
                 "success": True,
                 "message": f"All data cleared from Qdrant collection '{self.collection_name}'."
@@ -425,7 +799,9 @@ class TextChunker:
     async def delete_collection(self) -> bool:
         """Delete the entire collection"""
         try:
-            self.qdrant_client.delete_collection(self.collection_name)
+            await self.qdrant_client.delete_collection(self.collection_name)
+            self._initialized = False
+            await self._documents_changed()
             logger.info(f"✅ Deleted collection: {self.collection_name}")
             return True
             
@@ -436,10 +812,10 @@ class TextChunker:
     async def get_collection_info(self) -> Dict:
         """Get collection information and health status"""
         try:
-            collection_info = self.qdrant_client.get_collection(self.collection_name)
+            collection_info = await self.qdrant_client.get_collection(self.collection_name)
             
             # Count points
-            count_result = self.qdrant_client.count(
+            count_result = await self.qdrant_client.count(
                 collection_name=self.collection_name
             )
             
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, timezone
 from app.auth.jwt_handler import jwt_handler
 from app.auth import auth_utils
-from app.services.database import create_user, update_user_password
+from app.services.database import AUTH_PROJECTION, create_user, get_user_by_username, update_user_password
+from app.services.user_cache import invalidate_user
 from app.models.schemas import UserCreate, Token, APIResponse, PasswordChange
 from app.config import settings
 import logging
@@ -12,22 +13,23 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Token lifetime, fixed for the process
+ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.access_token_expire_minutes)
+ACCESS_TOKEN_EXPIRES_IN = settings.access_token_expire_minutes * 60  # seconds
+
 @router.post("/register", response_model=APIResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(user: UserCreate):
     """Register a new user"""
     try:
-        # Validate password strength
-        auth_utils.auth_utils.validate_password_strength(user.password)
-        
         # Hash the password
-        hashed_password = auth_utils.auth_utils.get_password_hash(user.password)
+        hashed_password = await auth_utils.auth_utils.get_password_hash_async(user.password)
         
         # Prepare user data
         user_data = {
             "username": user.username,
             "password": hashed_password,
             "is_admin": user.is_admin,  # Add admin flag
-            "created_at": datetime.utcnow(),
+            "created_at": datetime.now(timezone.utc),
             "is_active": True,
             "last_login": None
         }
@@ -70,10 +72,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             )
         
         # Create access token
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
         access_token = jwt_handler.create_access_token(
             data={"sub": user["username"]},
-            expires_delta=access_token_expires
+            expires_delta=ACCESS_TOKEN_EXPIRES
         )
         
         # Update last login time (optional)
@@ -83,7 +84,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         return Token(
             access_token=access_token,
             token_type="bearer",
-            expires_in=settings.access_token_expire_minutes * 60  # Convert to seconds
+            expires_in=ACCESS_TOKEN_EXPIRES_IN
         )
         
     except HTTPException:
@@ -104,7 +105,7 @@ async def refresh_token(current_token: str = Depends(auth_utils.oauth2_scheme)):
         return Token(
             access_token=new_token,
             token_type="bearer",
-            expires_in=settings.access_token_expire_minutes * 60
+            expires_in=ACCESS_TOKEN_EXPIRES_IN
         )
         
     except HTTPException:
@@ -115,7 +116,6 @@ async def refresh_token(current_token: str = Depends(auth_utils.oauth2_scheme)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Token refresh failed"
         )
-from app.services.database import get_user_by_username
 @router.post("/change-password", response_model=APIResponse)
 async def change_password(
     password_data: PasswordChange,
@@ -124,18 +124,15 @@ async def change_password(
     """Change user password"""
     try:
         # Verify current password
-        user_with_password = await get_user_by_username(current_user["username"])
-        if not auth_utils.auth_utils.verify_password(password_data.current_password, user_with_password["password"]):
+        user_with_password = await get_user_by_username(current_user["username"], projection=AUTH_PROJECTION)
+        if not await auth_utils.auth_utils.verify_password_async(password_data.current_password, user_with_password["password"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
         
-        # Validate new password strength
-        auth_utils.AuthUtils.validate_password_strength(password_data.new_password)
-        
         # Hash new password
-        new_hashed_password = auth_utils.AuthUtils.get_password_hash(password_data.new_password)
+        new_hashed_password = await auth_utils.AuthUtils.get_password_hash_async(password_data.new_password)
         
         # Update password in database
         success = await update_user_password(current_user["username"], new_hashed_password)
@@ -145,6 +142,7 @@ async def change_password(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update password"
             )
+        await invalidate_user(current_user["username"])
         
         logger.info(f"Password changed successfully for user: {current_user['username']}")
         return APIResponse(message="Password updated successfully")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, status, File, UploadFile, Form,BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.auth.auth_utils import get_current_user, get_current_admin_user
 from app.rag.file_processor import file_processor
 from app.rag.rag_system import rag_system
@@ -16,8 +16,12 @@ from app.rag.models import (
 )
 from app.services.database import upsert_message_in_session,fetch_message_history
 from app.services.task import process_and_store_task
+from app.services.upload_store import stage_upload
 from typing import List
+from app.config import settings
+import asyncio
 import logging
+import orjson
 import uuid
 from datetime import datetime
 
@@ -35,10 +39,13 @@ async def chat_with_documents(
     """
     try:
         user_id = current_user.get("username")
-        await upsert_message_in_session(user_id, chat_request.question, msg_type="user")
+        # Store the question while the answer is generated
+        user_message_write = asyncio.create_task(
+            upsert_message_in_session(user_id, "user", chat_request.question)
+        )
         
         # Generate conversation ID if not provided
-        conversation_id = chat_request.conversation_id or str(uuid.uuid4())
+        conversation_id = chat_request.conversation_id or uuid.uuid4().hex
         
         # Get response from RAG system
         rag_response = await rag_system.generate_response(
@@ -61,7 +68,9 @@ async def chat_with_documents(
                 for source in rag_response["sources"]
             ]
         
-        await upsert_message_in_session(user_id, rag_response["response"], msg_type="Ai_assistant")
+        # The question must be stored before the answer so the history keeps its order
+        await user_message_write
+        await upsert_message_in_session(user_id, "Ai_assistant", rag_response["response"])
         response = ChatResponse(
             response=rag_response["response"],
             sources=sources,
@@ -81,6 +90,46 @@ async def chat_with_documents(
         )
 
 
+@router.post("/ask/stream")
+async def chat_with_documents_stream(
+    chat_request: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Chat with your uploaded documents using RAG, streaming the answer as server-sent events
+    """
+    user_id = current_user.get("username")
+    # Store the question while the answer is generated
+    user_message_write = asyncio.create_task(
+        upsert_message_in_session(user_id, "user", chat_request.question)
+    )
+    
+    # Generate conversation ID if not provided
+    conversation_id = chat_request.conversation_id or uuid.uuid4().hex
+    
+    async def event_stream():
+        response_parts = []
+        async for event in rag_system.generate_response_stream(
+            query=chat_request.question,
+            user_id=user_id,
+            conversation_history=[]
+        ):
+            if event["type"] == "token":
+                response_parts.append(event["content"])
+            elif event["type"] == "sources":
+                event["conversation_id"] = conversation_id
+                if not chat_request.include_sources:
+                    event["sources"] = []
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+        
+        # Store the assistant message once the full answer is known, after the question
+        await user_message_write
+        if response_parts:
+            await upsert_message_in_session(user_id, "Ai_assistant", "".join(response_parts))
+        logger.info(f"✅ Chat response streamed for user: {user_id}")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/chat_history", response_model=Chat_history_Response)
 async def get_chat_history(request: ChatHistoryRequest): #
     """
@@ -131,19 +180,12 @@ async def delete_user_documents(
 
 @router.delete("/vector-db", response_model=DeleteResponse)
 async def delete_vector_database(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_admin_user)
 ):
     """
     Delete entire vector database collection (Admin only - be careful!)
     """
     try:
-        # Check if user is admin
-        if current_user.get("username") != "admin" and not current_user.get("is_admin", False):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only administrators can delete the entire vector database"
-            )
-        
         # Delete entire collection
         success = await text_chunker.delete_collection()
         
@@ -168,6 +210,26 @@ async def delete_vector_database(
             detail=f"Failed to delete vector database: {str(e)}"
         )
 
+@router.get("/documents/summary", response_model=DocumentSummary)
+async def get_documents_summary(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Summarize the documents the current user has uploaded
+    """
+    try:
+        user_id = current_user.get("username")
+        summary = await text_chunker.get_user_summary(user_id)
+        
+        return DocumentSummary(**summary)
+        
+    except Exception as e:
+        logger.error(f"❌ Document summary error for user {current_user.get('username')}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to summarize documents: {str(e)}"
+        )
+
 @router.get("/health", response_model=VectorDBHealth)
 async def check_vector_db_health(
     current_user: dict = Depends(get_current_user)
@@ -203,21 +265,45 @@ async def batch_upload_documents(
         results = []
         errors = []
         
+        # Reject empty and oversized files before any of them is processed
+        accepted_files = []
         for file in files:
             try:
-                result = await file_processor.process_and_store(file, user_id)
-                results.append({
-                    "filename": result["filename"],
-                    "status": "success",
-                    "chunks_created": result["chunks_created"]
-                })
-            except Exception as e:
+                file_processor.check_upload_size(file)
+                accepted_files.append(file)
+            except HTTPException as e:
                 errors.append({
                     "filename": file.filename,
                     "status": "error",
                     "error": str(e)
                 })
         
+        # Files are embedded and stored concurrently; the semaphore protects the embedding backend
+        semaphore = asyncio.Semaphore(settings.upload_concurrency)
+        
+        async def process_file(file: UploadFile):
+            async with semaphore:
+                return await file_processor.process_and_store(file, user_id)
+        
+        outcomes = await asyncio.gather(
+            *(process_file(file) for file in accepted_files),
+            return_exceptions=True
+        )
+        
+        for file, outcome in zip(accepted_files, outcomes):
+            if isinstance(outcome, Exception):
+                errors.append({
+                    "filename": file.filename,
+                    "status": "error",
+                    "error": str(outcome)
+                })
+            else:
+                results.append({
+                    "filename": outcome["filename"],
+                    "status": "success",
+                    "chunks_created": outcome["chunks_created"]
+                })
+        
         logger.info(f"✅ Batch upload completed for user: {user_id}")
         
         return {
@@ -245,18 +331,32 @@ async def batch_upload_documents(
     try:
         user_id = current_user.get("username")
         task_ids = []
+        rejected_files = []
         
         logger.info(f"📁 Starting batch upload of {len(files)} files for user {user_id}")
 
         for i, file in enumerate(files):
-            file_content = await file.read()
-            logger.info(f"📄 File {i+1}/{len(files)}: {file.filename}, size={len(file_content)} bytes")
+            # Empty and oversized files are rejected before anything is staged
+            try:
+                file_processor.check_upload_size(file)
+            except HTTPException as e:
+                logger.warning(f"⚠️ Rejected {file.filename}: {e.detail}")
+                rejected_files.append({
+                    "filename": file.filename,
+                    "status": "rejected",
+                    "error": e.detail
+                })
+                continue
+            
+            # Stage the bytes in Redis and queue only the key, keeping the broker payload small
+            storage_key, file_size = await stage_upload(file)
+            logger.info(f"📄 File {i+1}/{len(files)}: {file.filename}, size={file_size} bytes")
             
-            if len(file_content) == 0:
+            if storage_key is None:
                 logger.warning(f"⚠️ File {file.filename} is empty!")
                 continue
                 
-            task = process_and_store_task.delay(file_content, file.filename, user_id)
+            task = process_and_store_task.delay(storage_key, file.filename, user_id)
             task_ids.append({
                 "filename": file.filename,
                 "task_id": task.id,
@@ -268,7 +368,8 @@ async def batch_upload_documents(
         return {
             "success": True,
             "total_files": len(files),
-            "queued_tasks": task_ids
+            "queued_tasks": task_ids,
+            "rejected_files": rejected_files
         }
 
     except Exception as e:
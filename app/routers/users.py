@@ -1,17 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from app.auth.auth_utils import get_current_user, get_current_admin_user
-from app.services.database import get_all_users, delete_user, get_user_by_username
+from app.services.database import get_users_page, delete_user, get_user_public
+from app.services.user_cache import invalidate_user
 from app.models.schemas import UserResponse, APIResponse, UserList
+from typing import Optional
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# Profile fields that change a user's ETag
+ETAG_FIELDS = ("username", "created_at", "last_login", "updated_at", "is_active", "is_admin")
+
+def _user_etag(user: dict) -> str:
+    """Quoted ETag for a user profile"""
+    fingerprint = "|".join(str(user.get(field, "")) for field in ETAG_FIELDS)
+    return f'"{hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()}"'
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already holds this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_current_user_profile(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """Get current user profile"""
     try:
+        etag = _user_etag(current_user)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        
+        response.headers["ETag"] = etag
         return UserResponse(**current_user)
     except Exception as e:
         logger.error(f"Error getting user profile for '{current_user.get('username')}': {e}")
@@ -23,21 +51,19 @@ async def get_current_user_profile(current_user: dict = Depends(get_current_user
 @router.get("/", response_model=UserList)
 async def get_users_list(
     current_user: dict = Depends(get_current_admin_user),
-    skip: int = 0,
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500)
 ):
     """Get all users (Admin only)"""
     try:
-        users = await get_all_users()
-        
-        # Apply pagination
-        paginated_users = users[skip:skip + limit]
+        # Paginate in MongoDB so only the requested page is loaded
+        users, total = await get_users_page(skip, limit)
         
-        user_responses = [UserResponse(**user) for user in paginated_users]
+        user_responses = [UserResponse(**user) for user in users]
         
         return UserList(
             users=user_responses,
-            total=len(users)
+            total=total
         )
         
     except Exception as e:
@@ -50,11 +76,13 @@ async def get_users_list(
 @router.get("/{username}", response_model=UserResponse)
 async def get_user_by_username_endpoint(
     username: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_admin_user)
 ):
     """Get specific user by username (Admin only)"""
     try:
-        user = await get_user_by_username(username)
+        user = await get_user_public(username)
         
         if not user:
             raise HTTPException(
@@ -62,9 +90,13 @@ async def get_user_by_username_endpoint(
                 detail=f"User '{username}' not found"
             )
         
-        # Remove password field
-        user_safe = {k: v for k, v in user.items() if k != "password"}
-        return UserResponse(**user_safe)
+        etag = _user_etag(user)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        
+        response.headers["ETag"] = etag
+        return UserResponse(**user)
         
     except HTTPException:
         raise
@@ -86,6 +118,7 @@ async def delete_current_user(current_user: dict = Depends(get_current_user)):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete user account"
             )
+        await invalidate_user(current_user["username"])
         
         logger.info(f"User account deleted: {current_user['username']}")
         return APIResponse(message="User account deleted successfully")
@@ -107,7 +140,7 @@ async def delete_user_by_username(
     """Delete user by username (Admin only)"""
     try:
         # Check if user exists
-        user = await get_user_by_username(username)
+        user = await get_user_public(username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -128,6 +161,7 @@ async def delete_user_by_username(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete user"
             )
+        await invalidate_user(username)
         
         logger.info(f"User '{username}' deleted by admin: {current_user['username']}")
         return APIResponse(message=f"User '{username}' deleted successfully")
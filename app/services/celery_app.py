@@ -1,8 +1,9 @@
 from celery import Celery
+from app.config import settings
 import os
 
 # Broker and backend (example using Redis)
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_URL = settings.redis_url
 
 celery_app = Celery(
     "New_document_tasks",
@@ -17,6 +18,19 @@ celery_app.conf.update(
     accept_content=["json"],
     timezone="UTC",
     enable_utc=True,
+    # Nothing reads task results back, so don't store them
+    task_ignore_result=True,
+    task_compression="gzip",
+    result_compression="gzip",
+    broker_transport_options={"visibility_timeout": 3600},
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    # Ingestion is memory hungry: bound parallelism and runtime, and recycle children to release memory
+    worker_concurrency=settings.celery_concurrency or os.cpu_count() or 2,
+    task_soft_time_limit=settings.celery_task_soft_time_limit,
+    task_time_limit=settings.celery_task_time_limit,
+    worker_max_tasks_per_child=settings.celery_max_tasks_per_child,
 )
 
-import app.services.task
+# Workers register app/services/task.py when they start; the API imports the tasks it enqueues itself
+celery_app.autodiscover_tasks(packages=["app.services"], related_name="task")
@@ -1,25 +1,49 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import DuplicateKeyError
+from pymongo import AsyncMongoClient, WriteConcern
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from redis.exceptions import RedisError
 from app.config import settings
+from .redis_client import async_redis
+from typing import List, Optional, Tuple
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# History cache generations must outlive the cached histories (history_cache_ttl_seconds) by a wide
+# margin, so an expired counter can't restart at a generation that still has entries
+HISTORY_GENERATION_TTL_SECONDS = 24 * 3600
+
 class MongoDB:
-    client: AsyncIOMotorClient = None
+    client: AsyncMongoClient = None
     database = None
+    # Collection handles, bound once on connect
+    users = None
+    chats = None
 
 mongodb = MongoDB()
 
 async def connect_to_mongo():
     """Create database connection"""
     try:
-        mongodb.client = AsyncIOMotorClient(settings.mongodb_url)
+        mongodb.client = AsyncMongoClient(
+            settings.mongodb_url,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            minPoolSize=settings.mongodb_min_pool_size,
+            waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms
+        )
         mongodb.database = mongodb.client[settings.database_name]
+        mongodb.users = mongodb.database[settings.users_collection]
+        # Chat messages only wait for the primary's ack, not for replication
+        mongodb.chats = mongodb.database.get_collection(
+            settings.users_chat_collection,
+            write_concern=WriteConcern(w=1)
+        )
         
-        # Create unique index on username
-        await mongodb.database[settings.users_collection].create_index(
-            "username", unique=True
+        # Unique lookup keys: username for users, sessionId for chat sessions.
+        # The sessionId index also keeps concurrent upserts from creating duplicate sessions.
+        await asyncio.gather(
+            _ensure_unique_index(mongodb.users, "username"),
+            _ensure_unique_index(mongodb.chats, "sessionId")
         )
     
         logger.info("Connected to MongoDB")
@@ -28,10 +52,21 @@ async def connect_to_mongo():
         logger.error(f"Could not connect to MongoDB: {e}")
         raise
 
+async def _ensure_unique_index(collection, field: str):
+    """Build a unique index, leaving it missing rather than failing startup if the build fails"""
+    try:
+        await collection.create_index(field, unique=True)
+    except OperationFailure as e:
+        # Typically duplicates left by the old find-then-insert path; lookups still work without it
+        logger.error(
+            f"❌ Could not create unique index on {collection.name}.{field}, "
+            f"remove duplicate {field} values and restart to build it: {e}"
+        )
+
 async def close_mongo_connection():
     """Close database connection"""
     if mongodb.client:
-        mongodb.client.close()
+        await mongodb.client.close()
         logger.info("Disconnected from MongoDB")
 
 async def get_database():
@@ -39,31 +74,51 @@ async def get_database():
     return mongodb.database
 
 # User operations
-async def get_user_by_username(username: str):
-    """Get user by username"""
-    collection = mongodb.database[settings.users_collection]
-    user = await collection.find_one({"username": username})
+# Fields credential checks need; everything else stays in MongoDB
+AUTH_PROJECTION = {"_id": 0, "username": 1, "password": 1}
+
+async def get_user_by_username(username: str, projection: Optional[dict] = None):
+    """Get user by username, optionally limited to the projected fields"""
+    collection = mongodb.users
+    user = await collection.find_one({"username": username}, projection=projection)
+    return user
+
+async def get_user_public(username: str):
+    """Get user by username without the password hash or _id"""
+    collection = mongodb.users
+    user = await collection.find_one(
+        {"username": username},
+        projection={"password": 0, "_id": 0}
+    )
     return user
 
 async def create_user(user_data: dict):
     """Create new user"""
-    collection = mongodb.database[settings.users_collection]
+    collection = mongodb.users
     try:
         result = await collection.insert_one(user_data)
         return result.inserted_id
     except DuplicateKeyError:
         raise ValueError("Username already exists")
 
-async def get_all_users():
-    """Get all users"""
-    collection = mongodb.database[settings.users_collection]
-    cursor = collection.find({}, {"password": 0})  # Exclude password field
-    users = await cursor.to_list(length=None)
+async def get_all_users(skip: int = 0, limit: int = 100) -> List[dict]:
+    """Get one page of users, ordered by insertion"""
+    collection = mongodb.users
+    cursor = collection.find({}, {"password": 0}).sort("_id", 1).skip(skip).limit(limit)  # Exclude password field
+    users = await cursor.to_list(length=limit)
     return users
 
+async def get_users_page(skip: int, limit: int) -> Tuple[List[dict], int]:
+    """Get one page of users and the (estimated) total number of users"""
+    users, total = await asyncio.gather(
+        get_all_users(skip, limit),
+        mongodb.users.estimated_document_count()
+    )
+    return users, total
+
 async def update_user_password(username: str, hashed_password: str):
     """Update user password"""
-    collection = mongodb.database[settings.users_collection]
+    collection = mongodb.users
     result = await collection.update_one(
         {"username": username},
         {"$set": {"password": hashed_password}}
@@ -72,85 +127,182 @@ async def update_user_password(username: str, hashed_password: str):
 
 async def delete_user(username: str):
     """Delete user"""
-    collection = mongodb.database[settings.users_collection]
+    collection = mongodb.users
     result = await collection.delete_one({"username": username})
     return result.deleted_count > 0
 
-from datetime import datetime
-import traceback
-from typing import Union
+from datetime import datetime, timezone
+from typing import Any, Union
+
+
+def normalize_message(message: Union[str, dict, list]) -> Tuple[Any, Any]:
+    """
+    Splits a message into its stored content and plain-text variant.
+    Call it where structured (dict/list) messages are produced; plain strings need no normalizing.
+    """
+    if isinstance(message, dict):
+        return message, message.get("project_planner_output", message)
+
+    if isinstance(message, list) and message and isinstance(message[0], dict):
+        if "project_planner_output" in message[0]:
+            return message, message[0].get("project_planner_output", "")
+        raise ValueError("Invalid list format: expected dict with 'project_planner_output'")
 
+    return message, message
 
-async def upsert_message_in_session(session_id: str, message: Union[str, dict, list], msg_type: str):
+
+async def upsert_message_in_session(session_id: str, msg_type: str, content: Any, content_only: Any = None):
     """
     Inserts a new session if it doesn't exist, or appends a message if it does.
     
     Args:
         session_id (str): Unique session ID.
-        message (str | dict | list): The user's or assistant's message.
         msg_type (str): Type of message (e.g., 'user', 'assistant').
+        content: The message as stored; see normalize_message for structured messages.
+        content_only: Plain-text variant of the message; defaults to content.
+    """
+    return await upsert_messages_in_session(session_id, [(msg_type, content, content_only)])
+
+
+async def upsert_messages_in_session(session_id: str, items: List[Tuple[str, Any, Any]]):
+    """
+    Appends several messages to a session in one write, creating the session if needed.
+    
+    Args:
+        session_id (str): Unique session ID.
+        items (list): (msg_type, content, content_only) triples in conversation order;
+            a None content_only stores content as the plain-text variant.
     """
     try:
-        chat_collection = mongodb.database[settings.users_chat_collection]
+        chat_collection = mongodb.chats
 
-        existing_session = await chat_collection.find_one({"sessionId": session_id})
+        msg_docs = [{"type": msg_type, "content": content} for msg_type, content, _ in items]
+        msg_only_docs = [
+            {"type": msg_type, "content": content if content_only is None else content_only}
+            for msg_type, content, content_only in items
+        ]
 
-        if isinstance(message, dict):
-            message_str = message
-            message_str_only = message.get("project_planner_output", message)
+        now = datetime.now(timezone.utc)
 
-        elif isinstance(message, list) and message and isinstance(message[0], dict):
-            if "project_planner_output" in message[0]:
-                message_str = message
-                message_str_only = message[0].get("project_planner_output", "")
-            else:
-                raise ValueError("Invalid list format: expected dict with 'project_planner_output'")
-        else:
-            message_str = message
-            message_str_only = message
-
-        if existing_session:
-            # Append to existing session
-            await chat_collection.update_one(
-                {"sessionId": session_id},
-                {
-                    "$push": {"msg": {"type": msg_type, "content": message_str}},
-                    "$set": {"updated_at": datetime.utcnow()}
-                }
-            )
-            logger.info("✅ Message appended to existing session.")
-        else:
-            # Create new session
-            chat_doc = {
-                "sessionId": session_id,
-                "msg": [{"type": msg_type, "content": message_str}],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            await chat_collection.insert_one(chat_doc)
-
-            chat_doc_only = {
-                "sessionId": session_id,
-                "msg": [{"type": msg_type, "content": message_str_only}],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            await mongodb.database["chat_only_history"].insert_one(chat_doc_only)
+        # One atomic round trip: appends to the session, creating it first if needed.
+        # msg_only keeps the plain-text variant next to the full message; both arrays
+        # keep only the newest messages so session documents stay bounded.
+        keep_last = -settings.chat_history_max_messages
+        result = await chat_collection.update_one(
+            {"sessionId": session_id},
+            {
+                "$push": {
+                    "msg": {"$each": msg_docs, "$slice": keep_last},
+                    "msg_only": {"$each": msg_only_docs, "$slice": keep_last}
+                },
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+
+        # A read that loaded the old history before this write caches it under the old generation
+        await _bump_history_generation(session_id)
 
+        if result.upserted_id is None:
+            logger.info(f"✅ {len(msg_docs)} message(s) appended to existing session.")
+        else:
             logger.info("✅ New session created.")
 
         return True
 
     except Exception as e:
-        logger.error(f"❌ Error in upsert_message_in_session: {e}")
+        logger.error(f"❌ Error in upsert_messages_in_session: {e}")
         return False
 
 
+def _history_cache_key(session_id: str, generation: int) -> str:
+    return f"histstr:{session_id}:{generation}"
+
+def _history_generation_key(session_id: str) -> str:
+    return f"histgen:{session_id}"
+
+async def _bump_history_generation(session_id: str):
+    """Move a session to a new cache generation, orphaning every history cached before the write"""
+    generation_key = _history_generation_key(session_id)
+    try:
+        async with async_redis.pipeline(transaction=True) as pipe:
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, HISTORY_GENERATION_TTL_SECONDS)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ Could not invalidate history cache for {session_id}: {e}")
+
 async def fetch_message_history(session_id: str, last_n_messages: int = -5) -> str:
-    chat_collection = mongodb.database[settings.users_chat_collection]
+    # Formatted histories are cached in a Redis hash per session generation, keyed by slice size;
+    # Redis being unavailable only costs the cache, never the request
+    try:
+        generation = int(await async_redis.get(_history_generation_key(session_id)) or 0)
+    except RedisError as e:
+        logger.warning(f"⚠️ History cache read failed for {session_id}: {e}")
+        return await _load_message_history(session_id, last_n_messages)
+
+    cache_key = _history_cache_key(session_id, generation)
+    try:
+        cached = await async_redis.hget(cache_key, last_n_messages)
+        if cached is not None:
+            return cached.decode()
+    except RedisError as e:
+        logger.warning(f"⚠️ History cache read failed for {session_id}: {e}")
+
+    msg_str = await _load_message_history(session_id, last_n_messages)
+
+    try:
+        async with async_redis.pipeline(transaction=True) as pipe:
+            pipe.hset(cache_key, last_n_messages, msg_str)
+            pipe.expire(cache_key, settings.history_cache_ttl_seconds)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ History cache write failed for {session_id}: {e}")
+
+    return msg_str
+
+async def _load_message_history(session_id: str, last_n_messages: int) -> str:
+    """Join the last messages of a session inside MongoDB so only the final string is sent"""
+    pipeline = [
+        {"$match": {"sessionId": session_id}},
+        {"$project": {"_id": 0, "tail": {"$slice": ["$msg", last_n_messages]}}},
+        {"$project": {"joined": {"$reduce": {
+            "input": "$tail",
+            "initialValue": "",
+            "in": {"$concat": [
+                "$$value",
+                {"$cond": [{"$eq": ["$$value", ""]}, "", "\n"]},
+                "$$this.type", ": ", {"$toString": "$$this.content"}
+            ]}
+        }}}}
+    ]
+    try:
+        cursor = await mongodb.chats.aggregate(pipeline)
+        documents = await cursor.to_list(length=1)
+    except OperationFailure:
+        # $toString can't convert structured (dict/list) contents; format those in Python
+        return await _format_message_history(session_id, last_n_messages)
+
+    joined = documents[0].get("joined") if documents else None
+    if not joined:
+        return "No messages found."
+    return joined
+
+async def _format_message_history(session_id: str, last_n_messages: int) -> str:
+    """Format the last messages of a session in Python"""
+    chat_collection = mongodb.chats
+    # $slice alone still returns every other field, so the rest of the session document is excluded
     document = await chat_collection.find_one(
         {"sessionId": session_id},
-        {"msg": {"$slice": last_n_messages}}  # Slices the last n messages
+        {
+            "msg": {"$slice": last_n_messages},  # Slices the last n messages
+            "_id": 0,
+            "msg_only": 0,
+            "sessionId": 0,
+            "created_at": 0,
+            "updated_at": 0
+        }
     )
     
     # Check if document exists and has messages
@@ -0,0 +1,30 @@
+from typing import Optional
+from .redis_client import async_redis
+import logging
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Counters bumped whenever a user's documents change, shared by the API and Celery processes
+DOC_VERSION_PREFIX = "docver:"
+GLOBAL_DOC_VERSION_KEY = f"{DOC_VERSION_PREFIX}*"
+
+async def get_doc_version(user_id: str) -> Optional[str]:
+    """Version of a user's documents for cache keys; None if Redis can't be read"""
+    try:
+        global_version, user_version = await async_redis.mget(
+            GLOBAL_DOC_VERSION_KEY, f"{DOC_VERSION_PREFIX}{user_id}"
+        )
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not read document version for {user_id}: {e}")
+        return None
+    return f"{int(global_version or 0)}.{int(user_version or 0)}"
+
+async def bump_doc_version(user_id: Optional[str] = None):
+    """Mark a user's documents as changed, or everyone's if no user is given"""
+    key = f"{DOC_VERSION_PREFIX}{user_id}" if user_id else GLOBAL_DOC_VERSION_KEY
+    try:
+        await async_redis.incr(key)
+    except redis.RedisError as e:
+        # Cached answers then live until their TTL runs out
+        logger.error(f"❌ Could not bump document version {key}: {e}")
@@ -0,0 +1,12 @@
+from app.config import settings
+import redis
+import redis.asyncio as aioredis
+
+# Shared Redis clients: the API uses the asyncio one, Celery workers the blocking one
+# Bounded timeouts, so an unreachable Redis degrades the caches instead of hanging requests
+_timeouts = {
+    "socket_timeout": settings.redis_socket_timeout,
+    "socket_connect_timeout": settings.redis_socket_connect_timeout
+}
+async_redis = aioredis.from_url(settings.redis_url, **_timeouts)
+sync_redis = redis.Redis.from_url(settings.redis_url, **_timeouts)
@@ -1,34 +1,68 @@
+from celery.signals import worker_process_init
 from app.services.celery_app import celery_app
 from app.rag.file_processor import file_processor
+from app.services.upload_store import fetch_upload, discard_upload
+from fastapi import UploadFile
+from io import BytesIO
+import asyncio
 import logging
-from fastapi import HTTPException, UploadFile
 
 
 logger = logging.getLogger(__name__)
 
-# file_processor = FileProcessor()
-@celery_app.task(name="task.process_and_store_task")
-def process_and_store_task(file_content: bytes, filename: str, user_id: str):
+# One event loop per worker process, reused by every task so async clients
+# (Qdrant, embeddings) keep their connections between tasks
+_worker_loop = None
+
+@worker_process_init.connect
+def init_worker_loop(**kwargs):
+    """Create the event loop of a freshly forked worker process"""
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """The worker's event loop; pools that don't fork (solo, threads) create it on first use"""
+    if _worker_loop is None:
+        init_worker_loop()
+    return _worker_loop
+
+def run_in_worker_loop(coro):
+    """Run a coroutine to completion on the worker's loop, leaving no tasks behind if it is interrupted"""
+    loop = get_worker_loop()
     try:
-        from fastapi import UploadFile
-        from io import BytesIO
-        import asyncio
-
-        # Rebuild UploadFile from raw bytes
-        file_obj = BytesIO(file_content)
-        file_obj.seek(0)  # ✅ Ensure we're at the beginning
-        upload_file = UploadFile(filename=filename, file=BytesIO(file_content))
-        upload_file.file.seek(0)  # ✅ Reset file pointer to beginning
-        # Better async handling
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(file_processor.process_and_store(upload_file, user_id))
+        return loop.run_until_complete(coro)
+    except BaseException:
+        # A soft time limit interrupts run_until_complete from a signal handler; without this the
+        # coroutine's child tasks (embedding batches, upserts) would resume during the next task
+        pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        raise
+
+@celery_app.task(name="task.process_and_store_task", ignore_result=True)
+def process_and_store_task(storage_key: str, filename: str, user_id: str):
+    try:
+        # The API staged the upload in Redis; only its key travels through the broker
+        file_content = fetch_upload(storage_key)
+        if file_content is None:
+            raise ValueError("Staged upload expired before it was processed")
+
+        # Wrap the bytes once; BytesIO shares the buffer instead of copying it, and the known
+        # size saves file_processor from seeking to measure it
+        upload_file = UploadFile(
+            file=BytesIO(file_content),
+            filename=filename,
+            size=len(file_content)
+        )
+        result = run_in_worker_loop(file_processor.process_and_store(upload_file, user_id))
         return result
 
     except Exception as e:
         logger.error(f"❌ Celery task failed for {filename}: {e}")
-        return {"success": False, "filename": filename, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "filename": filename, "error": str(e)}
+
+    finally:
+        discard_upload(storage_key)
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import Optional, Tuple
+from fastapi import UploadFile
+from app.config import settings
+from .redis_client import async_redis, sync_redis
+import logging
+import uuid
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Uploads are copied into Redis in chunks of this size
+STAGING_CHUNK_SIZE = 1024 * 1024  # 1MB
+STAGING_KEY_PREFIX = "upload:"
+
+async def stage_upload(file: UploadFile) -> Tuple[Optional[str], int]:
+    """Copy an upload into Redis chunk by chunk; returns its key (None if empty) and size"""
+    key = f"{STAGING_KEY_PREFIX}{uuid.uuid4().hex}"
+    size = 0
+
+    await file.seek(0)
+    while chunk := await file.read(STAGING_CHUNK_SIZE):
+        if size == 0:
+            await async_redis.set(key, chunk, ex=settings.upload_staging_ttl_seconds)
+        else:
+            await async_redis.append(key, chunk)
+        size += len(chunk)
+
+    return (key if size else None), size
+
+def fetch_upload(key: str) -> Optional[bytes]:
+    """Raw bytes of a staged upload, or None if it expired"""
+    return sync_redis.get(key)
+
+def discard_upload(key: str):
+    """Remove a staged upload once it has been processed"""
+    try:
+        sync_redis.delete(key)
+    except redis.RedisError as e:
+        # The TTL removes it eventually
+        logger.warning(f"⚠️ Could not delete staged upload {key}: {e}")
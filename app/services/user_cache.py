@@ -0,0 +1,94 @@
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+from typing import Dict, Hashable
+from app.config import settings
+from .database import get_user_public
+from .redis_client import async_redis
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-worker cache of public user documents (no password): (username, generation) -> user
+_user_cache = TTLCache(
+    maxsize=settings.user_cache_max_entries,
+    ttl=settings.user_cache_ttl_seconds
+)
+_user_cache_lock = asyncio.Lock()
+
+# Lookups in progress: concurrent misses for the same user share one MongoDB query
+_inflight: Dict[Hashable, asyncio.Future] = {}
+
+# Generations are bumped in Redis on delete and password change so every worker drops the user;
+# they must outlive the cached entries (user_cache_ttl_seconds) by a wide margin
+USER_GENERATION_TTL_SECONDS = 24 * 3600
+
+def _user_generation_key(username: str) -> str:
+    return f"usergen:{username}"
+
+async def get_cached_public_user(username: str):
+    """Get user by username without the password hash (shared, don't mutate)"""
+    try:
+        generation = int(await async_redis.get(_user_generation_key(username)) or 0)
+    except RedisError as e:
+        # Without the generation a cached entry might predate a change made by another worker
+        logger.warning(f"⚠️ User cache generation read failed for {username}: {e}")
+        return await get_user_public(username)
+    cache_key = (username, generation)
+    
+    async with _user_cache_lock:
+        user = _user_cache.get(cache_key)
+    if user is not None:
+        return user
+    
+    pending = _inflight.get(cache_key)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The request running the shared lookup was cancelled; look the user up ourselves
+            return await get_user_public(username)
+    
+    # The lookup runs outside the lock so one slow query doesn't hold up other users
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        user = await get_user_public(username)
+    except Exception as e:
+        future.set_exception(e)
+        # Mark it retrieved so no warning is logged when nobody else was waiting
+        future.exception()
+        raise
+    else:
+        future.set_result(user)
+    finally:
+        # An invalidation during the lookup replaces or drops the entry; don't cache stale data then
+        is_current = _inflight.get(cache_key) is future
+        if is_current:
+            del _inflight[cache_key]
+        if not future.done():
+            future.cancel()
+    
+    if user is not None and is_current:
+        async with _user_cache_lock:
+            _user_cache[cache_key] = user
+    return user
+
+async def invalidate_user(username: str):
+    """Drop a user's cached document after it changed, in this worker and (via Redis) all others"""
+    for key in [key for key in _user_cache if key[0] == username]:
+        _user_cache.pop(key, None)
+    for key in [key for key in _inflight if key[0] == username]:
+        del _inflight[key]
+    
+    generation_key = _user_generation_key(username)
+    try:
+        async with async_redis.pipeline(transaction=True) as pipe:
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, USER_GENERATION_TTL_SECONDS)
+            await pipe.execute()
+    except RedisError as e:
+        # Other workers then keep their entry until user_cache_ttl_seconds runs out
+        logger.error(f"❌ Could not bump user cache generation for {username}: {e}")